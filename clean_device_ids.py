@@ -10,7 +10,7 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'delivery_system.settings')
 django.setup()
 
-from motoboys.models import Motoboy
+from motoboys.models import Motoboy, MotoboyDevice
 
 def clean_device_ids():
     """Limpa todos os device_ids fixos do banco"""
@@ -31,6 +31,11 @@ def clean_device_ids():
         print(f"  Device IDs depois: {motoboy.device_ids}")
         print("---")
     
+    # A associação consultada pelo check-device fica em MotoboyDevice; limpa junto
+    # para as duas não divergirem (apagar dispara a invalidação do cache)
+    removed, _ = MotoboyDevice.objects.all().delete()
+    print(f"Associações de dispositivo removidas: {removed}")
+    
     print("✅ Device IDs limpos com sucesso!")
     print("🔄 Agora o sistema vai gerar IDs únicos automaticamente")
 
@@ -45,9 +45,12 @@ class DeliveryStatistics(models.Model):
         if date is None:
             date = timezone.now().date()
         
-        # Busca pedidos da data
+        # Busca pedidos da data por intervalo (created_at__date aplica uma função na
+        # coluna e impede o uso do índice de created_at)
+        day_start = timezone.make_aware(datetime.combine(date, datetime.min.time()))
         orders = Order.objects.filter(
-            created_at__date=date
+            created_at__gte=day_start,
+            created_at__lt=day_start + timedelta(days=1)
         )
         
         # Calcula estatísticas
@@ -0,0 +1,142 @@
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, cache, caches
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models import Prefetch, Max
+from core.models import Category, Product
+import time
+
+MENU_VERSION_KEY = 'menu:version'
+MENU_HITS_KEY = 'menu:stats:hits'
+MENU_MISSES_KEY = 'menu:stats:misses'
+
+# Nome do fragmento {% cache %} do cardápio em templates/core/home.html
+MENU_FRAGMENT_NAME = 'home_menu'
+
+
+def load_menu(include_unavailable=False, include_inactive_categories=False):
+    """Carrega categorias e produtos do cardápio em duas consultas fixas"""
+    products = Product.objects.order_by('order', 'name')
+    if not include_unavailable:
+        products = products.filter(is_available=True)
+
+    categories = Category.objects.order_by('order', 'name')
+    if not include_inactive_categories:
+        categories = categories.filter(is_active=True)
+
+    # Uma consulta para as categorias e outra para todos os produtos (Prefetch)
+    categories = list(categories.prefetch_related(
+        Prefetch('product_set', queryset=products, to_attr='menu_products')
+    ))
+
+    # Agrupa em memória, mantendo a ordem categoria -> produto
+    menu_data = {}
+    all_products = []
+    for category in categories:
+        all_products.extend(category.menu_products)
+        if category.is_active:
+            menu_data[category] = category.menu_products
+
+    return {
+        'categories': list(menu_data),
+        'products': all_products,
+        'menu_data': menu_data,
+    }
+
+
+def get_menu_version():
+    """Retorna a versão atual do cardápio (muda a cada alteração)"""
+    version = cache.get(MENU_VERSION_KEY)
+    if version is None:
+        # Começa de um timestamp para não reaproveitar entradas de versões antigas
+        cache.add(MENU_VERSION_KEY, int(time.time()), None)
+        version = cache.get(MENU_VERSION_KEY)
+    return version
+
+
+def bump_menu_version():
+    """Invalida o cardápio em cache incrementando a versão"""
+    try:
+        return cache.incr(MENU_VERSION_KEY)
+    except ValueError:
+        # Chave expirou ou cache foi reiniciado
+        version = int(time.time())
+        cache.set(MENU_VERSION_KEY, version, None)
+        return version
+
+
+def _count(key):
+    """Incrementa um contador de estatísticas do cache"""
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def get_cached_menu(include_unavailable=False, include_inactive_categories=False):
+    """Retorna o cardápio do cache, recarregando do banco apenas quando a versão muda"""
+    version = get_menu_version()
+    key = f'menu:{version}:{int(include_unavailable)}{int(include_inactive_categories)}'
+
+    menu = cache.get(key)
+    if menu is not None:
+        _count(MENU_HITS_KEY)
+        return menu
+
+    _count(MENU_MISSES_KEY)
+    menu = load_menu(include_unavailable, include_inactive_categories)
+    cache.set(key, menu, settings.MENU_CACHE_TIMEOUT)
+    return menu
+
+
+def menu_fragment_cached(version):
+    """Confere se o fragmento do cardápio da home está em cache para a versão e conta o acerto.
+
+    Com o fragmento em cache o template não avalia o cardápio, então get_cached_menu
+    não roda e não contaria nada; sem ele, get_cached_menu conta acerto ou falha.
+    """
+    try:
+        fragment_cache = caches['template_fragments']
+    except InvalidCacheBackendError:
+        fragment_cache = cache
+    if fragment_cache.has_key(make_template_fragment_key(MENU_FRAGMENT_NAME, [version])):
+        _count(MENU_HITS_KEY)
+        return True
+    return False
+
+
+def get_menu_last_modified():
+    """Retorna o maior updated_at entre categorias e produtos (calculado uma vez por versão)"""
+    key = f'menu:{get_menu_version()}:last_modified'
+    last_modified = cache.get(key)
+    if last_modified is None:
+        dates = [
+            Category.objects.aggregate(last=Max('updated_at'))['last'],
+            Product.objects.aggregate(last=Max('updated_at'))['last'],
+        ]
+        dates = [date for date in dates if date]
+        if not dates:
+            return None
+        last_modified = max(dates)
+        cache.set(key, last_modified, settings.MENU_CACHE_TIMEOUT)
+    return last_modified
+
+
+def get_menu_etag():
+    """ETag forte do cardápio baseado na versão e na última alteração"""
+    last_modified = get_menu_last_modified()
+    timestamp = int(last_modified.timestamp()) if last_modified else 0
+    return f'menu-{get_menu_version()}-{timestamp}'
+
+
+def get_menu_cache_stats():
+    """Retorna acertos, falhas e taxa de acerto do cache do cardápio"""
+    hits = cache.get(MENU_HITS_KEY, 0)
+    misses = cache.get(MENU_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'version': get_menu_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total * 100, 2) if total else 0,
+    }
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core.models import Category, Product
+from core.services import bump_menu_version
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_menu_cache(sender, **kwargs):
+    """Invalida o cardápio em cache quando categorias ou produtos mudam"""
+    bump_menu_version()
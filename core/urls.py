@@ -9,4 +9,5 @@ urlpatterns = [
     path('logout/', views.logout, name='logout'),
     path('admin_dashboard/', views.admin_dashboard, name='admin_dashboard'),
     path('products/', views.products_management, name='products_management'),
+    path('products/cache-stats/', views.menu_cache_stats, name='menu_cache_stats'),
 ]
@@ -3,24 +3,33 @@ from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.http import condition
+from django.conf import settings
 from core.models import Category, Product
+from core.services import (
+    load_menu, get_cached_menu, bump_menu_version, get_menu_cache_stats,
+    get_menu_version, get_menu_etag, get_menu_last_modified, menu_fragment_cached,
+)
 import json
 
+@condition(
+    etag_func=lambda request: get_menu_etag(),
+    last_modified_func=lambda request: get_menu_last_modified(),
+)
 def home(request):
     """Página inicial com cardápio"""
-    # Carrega categorias e produtos do banco de dados
-    categories = Category.objects.filter(is_active=True).order_by('order', 'name')
-    products = Product.objects.filter(is_available=True).order_by('category__order', 'order', 'name')
-    
-    # Agrupa produtos por categoria
-    menu_data = {}
-    for category in categories:
-        menu_data[category] = products.filter(category=category)
-    
+    # Cardápio vem do cache e só é carregado se o fragmento do template não estiver em cache
+    # (fragmento em cache conta como acerto aqui, já que o cardápio nem é lido)
+    menu_version = get_menu_version()
+    menu_fragment_cached(menu_version)
+    menu = SimpleLazyObject(get_cached_menu)
     context = {
-        'categories': categories,
-        'products': products,
-        'menu_data': menu_data
+        'categories': SimpleLazyObject(lambda: menu['categories']),
+        'products': SimpleLazyObject(lambda: menu['products']),
+        'menu_data': SimpleLazyObject(lambda: menu['menu_data']),
+        'menu_version': menu_version,
+        'menu_cache_timeout': settings.MENU_CACHE_TIMEOUT,
     }
     return render(request, 'core/home.html', context)
 
@@ -136,6 +145,7 @@ def products_management(request):
                     is_available=data.get('is_available', True),
                     order=data.get('order', 0)
                 )
+                bump_menu_version()
                 return JsonResponse({'success': True, 'message': 'Produto criado com sucesso!', 'product_id': product.id})
             
             elif action == 'update':
@@ -149,12 +159,14 @@ def products_management(request):
                 product.is_available = data.get('is_available', True)
                 product.order = data.get('order', 0)
                 product.save()
+                bump_menu_version()
                 return JsonResponse({'success': True, 'message': 'Produto atualizado com sucesso!'})
             
             elif action == 'delete':
                 # Deletar produto
                 product_id = data.get('product_id')
                 Product.objects.filter(id=product_id).delete()
+                bump_menu_version()
                 return JsonResponse({'success': True, 'message': 'Produto deletado com sucesso!'})
             
             elif action == 'toggle_availability':
@@ -164,21 +176,28 @@ def products_management(request):
                 product.is_available = not product.is_available
                 product.save()
                 status = "disponível" if product.is_available else "indisponível"
+                bump_menu_version()
                 return JsonResponse({'success': True, 'message': f'Produto marcado como {status}!', 'is_available': product.is_available})
                 
         except Exception as e:
             return JsonResponse({'success': False, 'message': f'Erro: {str(e)}'})
     
     # GET: Listar produtos e categorias
-    products = Product.objects.all().order_by('category__order', 'order', 'name')
-    categories = Category.objects.filter(is_active=True).order_by('order', 'name')
+    menu = load_menu(include_unavailable=True, include_inactive_categories=True)
     
     context = {
-        'products': products,
-        'categories': categories
+        'products': menu['products'],
+        'categories': menu['categories']
     }
     return render(request, 'core/products_management.html', context)
 
+def menu_cache_stats(request):
+    """Estatísticas do cache do cardápio (acertos/falhas)"""
+    if not request.session.get('admin_logged_in'):
+        return JsonResponse({'success': False, 'message': 'Acesso negado'}, status=403)
+    
+    return JsonResponse({'success': True, 'stats': get_menu_cache_stats()})
+
 def logout(request):
     """Logout do sistema"""
     request.session.flush()
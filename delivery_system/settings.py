@@ -93,6 +93,59 @@ DATABASES = {
 }
 
 
+# Cache
+# Em produção roda um único worker do gunicorn, então o cache local em memória basta
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'motodelivery',
+        # Padrão é 300 chaves; posições dos motoboys precisam de mais
+        'OPTIONS': {'MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 20000))},
+    }
+}
+
+# Tempo (segundos) que o cardápio fica em cache; a versão é invalidada a cada alteração
+MENU_CACHE_TIMEOUT = int(os.environ.get('MENU_CACHE_TIMEOUT', 60 * 60))
+
+# Backend do carrinho: 'orders.cart.SessionCart' (na sessão) ou 'orders.cart.DatabaseCart' (em CartItem)
+CART_BACKEND = os.environ.get('CART_BACKEND', 'orders.cart.SessionCart')
+
+# Itens de carrinho mais antigos que isso (horas) são removidos pelo clear_expired_carts
+CART_TTL_HOURS = int(os.environ.get('CART_TTL_HOURS', 72))
+
+# Guarda endereços resolvidos na tabela GeocodedAddress (além do cache em memória)
+GEOCODING_PERSIST = os.environ.get('GEOCODING_PERSIST', 'False').lower() == 'true'
+
+# Gerador de números de pedido e tamanho do bloco reservado por processo
+ORDER_NUMBER_ALLOCATOR = os.environ.get('ORDER_NUMBER_ALLOCATOR', 'orders.numbering.BlockOrderNumberAllocator')
+ORDER_NUMBER_BLOCK_SIZE = int(os.environ.get('ORDER_NUMBER_BLOCK_SIZE', 50))
+
+# Tempo (segundos) que a resposta do checkout fica guardada para o cabeçalho Idempotency-Key
+IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 24 * 60 * 60))
+
+# Tempo (segundos) que o id do cliente fica em cache por e-mail no checkout
+CUSTOMER_CACHE_TIMEOUT = int(os.environ.get('CUSTOMER_CACHE_TIMEOUT', 5 * 60))
+
+# Pedidos por página na lista de pedidos (o parâmetro ?page_size= é limitado ao máximo)
+ORDER_LIST_PAGE_SIZE = int(os.environ.get('ORDER_LIST_PAGE_SIZE', 50))
+ORDER_LIST_MAX_PAGE_SIZE = int(os.environ.get('ORDER_LIST_MAX_PAGE_SIZE', 200))
+
+# Despacho automático: validade da oferta, raio máximo até a retirada e pedidos por rodada
+DISPATCH_OFFER_TIMEOUT_SECONDS = int(os.environ.get('DISPATCH_OFFER_TIMEOUT_SECONDS', 30))
+DISPATCH_MAX_RADIUS_KM = float(os.environ.get('DISPATCH_MAX_RADIUS_KM', 10))
+DISPATCH_BATCH_SIZE = int(os.environ.get('DISPATCH_BATCH_SIZE', 2000))
+
+# Intervalo (segundos) entre as gravações em lote das posições dos motoboys (thread no worker web)
+LOCATION_FLUSH_INTERVAL_SECONDS = int(os.environ.get('LOCATION_FLUSH_INTERVAL_SECONDS', 10))
+
+# Dias que os trajetos dos motoboys ficam guardados (trechos mais velhos são apagados inteiros)
+LOCATION_TRACK_RETENTION_DAYS = int(os.environ.get('LOCATION_TRACK_RETENTION_DAYS', 90))
+
+# Segundos entre remontagens da grade de motoboys disponíveis usada na busca por proximidade
+RIDER_GRID_TTL_SECONDS = int(os.environ.get('RIDER_GRID_TTL_SECONDS', 5))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
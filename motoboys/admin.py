@@ -1,5 +1,13 @@
 from django.contrib import admin
-from .models import Motoboy
+from .models import Motoboy, MotoboyDevice, LocationTrack
+
+
+class MotoboyDeviceInline(admin.TabularInline):
+    """Dispositivos do motoboy (usados pelo check-device)"""
+    model = MotoboyDevice
+    extra = 0
+    readonly_fields = ('created_at',)
+
 
 @admin.register(Motoboy)
 class MotoboyAdmin(admin.ModelAdmin):
@@ -37,6 +45,22 @@ class MotoboyAdmin(admin.ModelAdmin):
     
     list_editable = ('status', 'is_active')
     
+    inlines = [MotoboyDeviceInline]
+    
+    def save_formset(self, request, form, formset, change):
+        """Depois de mexer nos dispositivos pelo inline, refaz Motoboy.device_ids a partir de MotoboyDevice"""
+        super().save_formset(request, form, formset, change)
+        if formset.model is not MotoboyDevice:
+            return
+        motoboy = form.instance
+        devices = set(motoboy.devices.values_list('device_id', flat=True))
+        # Mantém a ordem da lista antiga e acrescenta os novos no fim
+        device_ids = [device_id for device_id in motoboy.device_ids or [] if device_id in devices]
+        device_ids += sorted(devices - set(device_ids))
+        if device_ids != (motoboy.device_ids or []):
+            motoboy.device_ids = device_ids
+            motoboy.save(update_fields=['device_ids', 'updated_at'])
+    
     actions = ['activate_motoboys', 'deactivate_motoboys', 'set_available', 'set_offline']
     
     def activate_motoboys(self, request, queryset):
@@ -74,3 +98,21 @@ class MotoboyAdmin(admin.ModelAdmin):
     def has_change_permission(self, request, obj=None):
         """Permite editar motoboys"""
         return True
+
+
+@admin.register(LocationTrack)
+class LocationTrackAdmin(admin.ModelAdmin):
+    """Trechos de trajeto dos motoboys (somente leitura; o conteúdo é binário)"""
+    
+    list_display = ('motoboy', 'window_start', 'point_count', 'first_at', 'last_at', 'data_size')
+    list_filter = ('window_start',)
+    search_fields = ('motoboy__full_name', 'motoboy__vehicle_plate')
+    list_select_related = ('motoboy',)
+    date_hierarchy = 'window_start'
+    exclude = ('data',)
+    readonly_fields = ('motoboy', 'window_start', 'point_count', 'first_at', 'last_at', 'data_size')
+    
+    def data_size(self, obj):
+        """Tamanho do trecho codificado"""
+        return f'{len(obj.data)} bytes'
+    data_size.short_description = "Tamanho"
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class MotoboysConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'motoboys'
+
+    def ready(self):
+        # Registra os signals de invalidação do cache de dispositivos
+        from . import signals  # noqa: F401
@@ -0,0 +1,69 @@
+from collections import namedtuple
+from django.core.cache import cache
+from django.db import transaction
+from .models import Motoboy, MotoboyDevice
+import hashlib
+
+# Tempo de cache da resposta de check-device (dispositivo desconhecido expira antes)
+DEVICE_CACHE_TIMEOUT = 5 * 60
+UNKNOWN_DEVICE_CACHE_TIMEOUT = 60
+
+_MISSING = object()
+
+# O que o cache guarda do dono do dispositivo (não a instância inteira do Motoboy)
+DeviceOwner = namedtuple('DeviceOwner', ['id', 'full_name'])
+
+
+def _device_cache_key(device_id):
+    """Chave de cache do dispositivo (hash, já que o id vem do cliente)"""
+    return f'device:{hashlib.sha256(device_id.encode()).hexdigest()}'
+
+
+def invalidate_device(device_id):
+    """Remove o dispositivo do cache (chamado quando a associação muda)"""
+    if device_id:
+        cache.delete(_device_cache_key(device_id))
+
+
+def find_device_motoboy(device_id):
+    """Dono do dispositivo como DeviceOwner(id, full_name), ou None: cache ou uma consulta pelo índice único.
+
+    O nome guardado no cache é de quando foi lido; serve para identificar o dono, não
+    para ler dados que mudam (para isso, busque o Motoboy pelo id).
+    """
+    cache_key = _device_cache_key(device_id)
+    owner = cache.get(cache_key, _MISSING)
+    if owner is not _MISSING:
+        return owner
+
+    row = Motoboy.objects.filter(devices__device_id=device_id).values_list('id', 'full_name').first()
+    owner = DeviceOwner(*row) if row else None
+    cache.set(cache_key, owner, DEVICE_CACHE_TIMEOUT if owner else UNKNOWN_DEVICE_CACHE_TIMEOUT)
+    return owner
+
+
+def register_device(motoboy, device_id):
+    """Associa o dispositivo ao motoboy; se o aparelho era de outro, passa a ser deste (último login).
+
+    Também mantém a lista ``Motoboy.device_ids``, que continua existindo por compatibilidade:
+    o dispositivo entra na lista do novo dono e sai da do anterior.
+    """
+    with transaction.atomic():
+        previous_owner_id = (
+            MotoboyDevice.objects.select_for_update()
+            .filter(device_id=device_id)
+            .values_list('motoboy_id', flat=True)
+            .first()
+        )
+        MotoboyDevice.objects.update_or_create(device_id=device_id, defaults={'motoboy': motoboy})
+
+        if previous_owner_id is not None and previous_owner_id != motoboy.id:
+            previous = Motoboy.objects.select_for_update().only('device_ids').filter(id=previous_owner_id).first()
+            if previous and device_id in (previous.device_ids or []):
+                previous.device_ids = [known for known in previous.device_ids if known != device_id]
+                previous.save(update_fields=['device_ids', 'updated_at'])
+
+        device_ids = motoboy.device_ids or []
+        if device_id not in device_ids:
+            motoboy.device_ids = device_ids + [device_id]
+            motoboy.save(update_fields=['device_ids', 'updated_at'])
@@ -0,0 +1,269 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .tracks import append_points, from_ms, to_ms
+import atexit
+import numpy as np
+import threading
+import time
+import uuid
+
+# Buffer e cache (LocMem) são do processo do worker web: só ele lê posições ainda não
+# gravadas. Outros processos (dispatch_orders, shell) leem o banco, que a thread de
+# descarga mantém no máximo LOCATION_FLUSH_INTERVAL_SECONDS atrasado.
+
+# Última posição de cada motoboy ainda não gravada no banco: {motoboy_id: (lat, lng, horário)}
+_pending = {}
+_lock = threading.Lock()
+_flusher = None
+
+# Por quanto tempo a posição fica no cache para leitura (depois disso vale a do banco)
+LOCATION_CACHE_TIMEOUT = 10 * 60
+
+# Motoboys sem posição mais nova que isso não entram no despacho nem na busca por proximidade
+LOCATION_MAX_AGE = timedelta(minutes=10)
+
+# Motoboys por UPDATE na descarga do buffer
+FLUSH_BATCH_SIZE = 500
+
+# Limites de um lote de posições enviado pelo app
+MAX_FIXES_PER_UPLOAD = 500
+MAX_FIX_AGE = timedelta(hours=24)      # posições mais velhas são descartadas
+MAX_CLOCK_SKEW = timedelta(minutes=2)  # tolerância para relógio do celular adiantado
+
+
+def _as_uuid(motoboy_id):
+    """Ids chegam como UUID (models) ou texto (requisições); o buffer usa sempre UUID"""
+    return motoboy_id if isinstance(motoboy_id, uuid.UUID) else uuid.UUID(str(motoboy_id))
+
+
+def _cache_key(motoboy_id):
+    return f'location:{motoboy_id}'
+
+
+def record_location(motoboy_id, latitude, longitude, recorded_at=None):
+    """Registra a posição do motoboy no buffer em vez de fazer um UPDATE por ping.
+
+    Pings do mesmo motoboy se sobrescrevem em memória (fica só o mais recente) e a thread
+    de descarga grava o buffer em UPDATEs em lote a cada LOCATION_FLUSH_INTERVAL_SECONDS,
+    chegue ou não um novo ping. A posição também vai para o cache, de onde saem as
+    leituras de "localização atual" neste processo.
+    """
+    motoboy_id = _as_uuid(motoboy_id)
+    recorded_at = recorded_at or timezone.now()
+    position = (float(latitude), float(longitude), recorded_at)
+    # Já gravada, a última posição continua no cache: um lote atrasado não passa na frente dela
+    cached = cache.get(_cache_key(motoboy_id))
+
+    with _lock:
+        current = _pending.get(motoboy_id) or cached
+        newer = current is None or current[2] <= recorded_at
+        if newer:
+            _pending[motoboy_id] = position
+
+    if newer:
+        cache.set(_cache_key(motoboy_id), position, LOCATION_CACHE_TIMEOUT)
+    start_flusher()
+
+
+def _flush_loop():
+    """Corpo da thread de descarga: grava o buffer a cada intervalo"""
+    from django.db import connection
+
+    while True:
+        time.sleep(getattr(settings, 'LOCATION_FLUSH_INTERVAL_SECONDS', 10))
+        try:
+            if _pending:
+                flush_locations()
+        except Exception as e:
+            # As posições continuam no buffer e vão na próxima descarga
+            print(f"❌ Erro ao gravar localizações em lote: {e}")
+        finally:
+            # Conexão da thread não fica aberta entre descargas
+            connection.close()
+
+
+def start_flusher():
+    """Inicia (uma vez por processo, no primeiro ping) a thread que descarrega o buffer"""
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_loop, name='location-flusher', daemon=True)
+            _flusher.start()
+
+
+def flush_locations():
+    """Grava as posições acumuladas no Motoboy em UPDATEs em lote; retorna quantos motoboys.
+
+    Só grava a posição do buffer que for mais nova que a do banco (last_location_update
+    nulo ou anterior, lido com as linhas travadas): um lote de posições atrasado, ou um
+    ping que perdeu a corrida para Motoboy.update_location, não faz a posição voltar no tempo.
+    """
+    from .models import Motoboy
+
+    with _lock:
+        batch = dict(_pending)
+        _pending.clear()
+
+    if not batch:
+        return 0
+
+    ids = list(batch)
+    try:
+        with transaction.atomic():
+            for start in range(0, len(ids), FLUSH_BATCH_SIZE):
+                chunk = ids[start:start + FLUSH_BATCH_SIZE]
+                # Linhas travadas até o commit: ninguém grava uma posição entre a comparação e o UPDATE
+                stored = dict(
+                    Motoboy.objects.select_for_update().filter(id__in=chunk).values_list('id', 'last_location_update')
+                )
+                newer = []
+                for motoboy_id in chunk:
+                    latitude, longitude, recorded_at = batch[motoboy_id]
+                    if motoboy_id not in stored:
+                        continue
+                    if stored[motoboy_id] is not None and stored[motoboy_id] >= recorded_at:
+                        continue
+                    newer.append(Motoboy(
+                        id=motoboy_id,
+                        current_latitude=Decimal(f'{latitude:.6f}'),
+                        current_longitude=Decimal(f'{longitude:.6f}'),
+                        last_location_update=recorded_at,
+                    ))
+                if newer:
+                    Motoboy.objects.bulk_update(
+                        newer, ['current_latitude', 'current_longitude', 'last_location_update']
+                    )
+    except Exception:
+        # Devolve ao buffer o que não foi gravado (sem passar por cima de pings mais novos)
+        with _lock:
+            for motoboy_id, position in batch.items():
+                if motoboy_id not in _pending:
+                    _pending[motoboy_id] = position
+        raise
+
+    # Posições gravadas também entram no trajeto, mesmo as que não viraram a posição atual
+    try:
+        append_points(
+            ids,
+            [to_ms(batch[motoboy_id][2]) for motoboy_id in ids],
+            [batch[motoboy_id][0] for motoboy_id in ids],
+            [batch[motoboy_id][1] for motoboy_id in ids],
+        )
+    except Exception as e:
+        print(f"❌ Erro ao gravar trajetos: {e}")
+    return len(batch)
+
+
+def parse_fixes(fixes, now=None):
+    """Valida de uma vez um lote [{latitude, longitude, timestamp (epoch em ms)}].
+
+    Retorna (latitudes, longitudes, timestamps_ms, descartadas): arrays só com as
+    posições válidas, em ordem cronológica e sem horários repetidos. Posições fora da
+    faixa, não finitas, velhas demais ou no futuro são descartadas; lote malformado
+    (não é lista, grande demais, campo faltando ou não numérico) levanta ValueError.
+    """
+    if not isinstance(fixes, list) or not fixes:
+        raise ValueError('Nenhuma posição enviada')
+    if len(fixes) > MAX_FIXES_PER_UPLOAD:
+        raise ValueError(f'No máximo {MAX_FIXES_PER_UPLOAD} posições por envio')
+    try:
+        data = np.array(
+            [(fix['latitude'], fix['longitude'], fix['timestamp']) for fix in fixes], dtype=np.float64
+        )
+    except (KeyError, TypeError, ValueError):
+        raise ValueError('Cada posição precisa de latitude, longitude e timestamp numéricos')
+
+    now_ms = (now or timezone.now()).timestamp() * 1000
+    latitudes, longitudes, timestamps = data.T
+    with np.errstate(invalid='ignore'):
+        valid = (
+            np.isfinite(data).all(axis=1)
+            & (np.abs(latitudes) <= 90)
+            & (np.abs(longitudes) <= 180)
+            & (timestamps >= now_ms - MAX_FIX_AGE.total_seconds() * 1000)
+            & (timestamps <= now_ms + MAX_CLOCK_SKEW.total_seconds() * 1000)
+        )
+    data = data[valid]
+
+    # np.unique ordena e, para horários repetidos, fica com a primeira posição enviada
+    timestamps_ms = np.round(data[:, 2]).astype(np.int64)
+    timestamps_ms, first = np.unique(timestamps_ms, return_index=True)
+    data = data[first]
+    return data[:, 0], data[:, 1], timestamps_ms, len(fixes) - len(data)
+
+
+def record_fixes(motoboy_id, fixes, now=None):
+    """Registra um lote de posições do app: uma transação e um upsert de trajeto por envio.
+
+    Todas as posições válidas entram nos trechos de LocationTrack (reenvios do mesmo lote
+    não duplicam pontos) e a mais recente segue para o buffer de record_location, que
+    atualiza Motoboy.current_*. Retorna (aceitas, descartadas).
+    """
+    latitudes, longitudes, timestamps_ms, rejected = parse_fixes(fixes, now)
+    if not len(timestamps_ms):
+        return 0, rejected
+
+    motoboy_id = _as_uuid(motoboy_id)
+    append_points([motoboy_id] * len(timestamps_ms), timestamps_ms, latitudes, longitudes)
+    record_location(motoboy_id, latitudes[-1], longitudes[-1], recorded_at=from_ms(int(timestamps_ms[-1])))
+    return len(timestamps_ms), rejected
+
+
+def get_buffered_location(motoboy_id):
+    """Posição mais recente (lat, lng, horário) vista pelo buffer ou cache, ou None"""
+    motoboy_id = _as_uuid(motoboy_id)
+    with _lock:
+        position = _pending.get(motoboy_id)
+    return position or cache.get(_cache_key(motoboy_id))
+
+
+def get_buffered_locations(motoboy_ids):
+    """Versão em lote de get_buffered_location: {motoboy_id: (lat, lng, horário)}"""
+    motoboy_ids = [_as_uuid(motoboy_id) for motoboy_id in motoboy_ids]
+    with _lock:
+        positions = {motoboy_id: _pending[motoboy_id] for motoboy_id in motoboy_ids if motoboy_id in _pending}
+
+    missing = {_cache_key(motoboy_id): motoboy_id for motoboy_id in motoboy_ids if motoboy_id not in positions}
+    if missing:
+        for key, position in cache.get_many(list(missing)).items():
+            positions[missing[key]] = position
+    return positions
+
+
+def motoboy_exists(motoboy_id):
+    """Confere se o id é de um motoboy cadastrado, guardando a resposta positiva no cache"""
+    from .models import Motoboy
+
+    try:
+        motoboy_id = _as_uuid(motoboy_id)
+    except ValueError:
+        return False
+
+    key = f'motoboy:exists:{motoboy_id}'
+    if cache.get(key):
+        return True
+    exists = Motoboy.objects.filter(id=motoboy_id).exists()
+    if exists:
+        cache.set(key, True, LOCATION_CACHE_TIMEOUT)
+    return exists
+
+
+def pending_count():
+    """Quantos motoboys têm posição ainda não gravada no banco"""
+    with _lock:
+        return len(_pending)
+
+
+def _flush_at_exit():
+    """Não perde as últimas posições quando o worker é encerrado normalmente"""
+    if _pending:
+        flush_locations()
+
+
+atexit.register(_flush_at_exit)
@@ -0,0 +1,117 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from motoboys.locations import record_location, flush_locations, motoboy_exists
+from motoboys.models import Motoboy
+from orders.delivery import RESTAURANT_COORDS
+from users.models import User
+import numpy as np
+import time
+
+
+class Command(BaseCommand):
+    help = 'Teste de carga dos pings de localização: UPDATE por ping x buffer com gravação em lote (num banco de teste descartado no final)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--riders', type=int, default=2000, help='Motoboys simulados')
+        parser.add_argument('--interval', type=int, default=5, help='Segundos entre pings de cada motoboy')
+        parser.add_argument('--duration', type=int, default=60, help='Segundos simulados de pings')
+        parser.add_argument('--flush-interval', type=int, default=10, help='Segundos entre gravações em lote')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _create_riders(self, count):
+        users = User.objects.bulk_create([
+            User(username=f'bench-loc-{i}@motodelivery.com', email=f'bench-loc-{i}@motodelivery.com')
+            for i in range(count)
+        ])
+        return Motoboy.objects.bulk_create([
+            Motoboy(
+                user=user,
+                full_name=f'Benchmark {i}',
+                phone_number='+351900000000',
+                document_type='cnh',
+                document_number=f'BENCHLOC{i}',
+                vehicle_model='CG 160',
+                vehicle_plate=f'BL-{i:04d}',
+                vehicle_year=2020,
+                vehicle_color='Preta',
+                status='available',
+            )
+            for i, user in enumerate(users)
+        ])
+
+    def handle(self, *args, **options):
+        # Banco de teste próprio: os motoboys simulados ficam 'available' e o despacho
+        # real não pode oferecer pedidos a eles; tudo some junto com o banco no final
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _run(self, options):
+        rng = np.random.default_rng(options['seed'])
+        statements = []
+
+        def count_statements(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql, params, many, context)
+
+        motoboys = self._create_riders(options['riders'])
+        ids = [motoboy.id for motoboy in motoboys]
+        degrees = 8.0 / 111.32
+        latitudes = RESTAURANT_COORDS['lat'] + rng.normal(0, degrees, len(ids))
+        longitudes = RESTAURANT_COORDS['lng'] + rng.normal(0, degrees, len(ids))
+        required = len(ids) / options['interval']
+
+        # Antes: cada ping busca o motoboy e faz o próprio UPDATE (uma rodada da frota)
+        statements.clear()
+        with connection.execute_wrapper(count_statements):
+            start = time.perf_counter()
+            for motoboy_id, latitude, longitude in zip(ids, latitudes.tolist(), longitudes.tolist()):
+                Motoboy.objects.get(id=motoboy_id).update_location(round(latitude, 6), round(longitude, 6))
+            elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"UPDATE por ping  {len(ids) / elapsed:>10,.0f} pings/s  "
+            f"{len(statements) / len(ids):.2f} comandos SQL por ping"
+        )
+
+        # Depois: pings no buffer; uma gravação em lote a cada --flush-interval (tempo simulado)
+        rounds = options['duration'] // options['interval']
+        flush_every = max(options['flush_interval'] // options['interval'], 1)
+        clock = timezone.now()
+        flushes = 0
+        statements.clear()
+        # Intervalo enorme: a thread de descarga não grava no meio da medição, só as descargas manuais
+        with override_settings(LOCATION_FLUSH_INTERVAL_SECONDS=10 ** 9), \
+                connection.execute_wrapper(count_statements):
+            start = time.perf_counter()
+            for round_number in range(1, rounds + 1):
+                clock += timedelta(seconds=options['interval'])
+                latitudes += rng.normal(0, 0.0003, len(ids))
+                longitudes += rng.normal(0, 0.0003, len(ids))
+                for motoboy_id, latitude, longitude in zip(ids, latitudes.tolist(), longitudes.tolist()):
+                    if motoboy_exists(motoboy_id):
+                        record_location(motoboy_id, latitude, longitude, recorded_at=clock)
+                if round_number % flush_every == 0:
+                    flush_locations()
+                    flushes += 1
+            flush_locations()
+            elapsed = time.perf_counter() - start
+
+        pings = rounds * len(ids)
+        self.stdout.write(
+            f"Buffer + lote    {pings / elapsed:>10,.0f} pings/s  "
+            f"{len(statements) / pings:.3f} comandos SQL por ping "
+            f"({len(statements)} comandos para {pings} pings, {flushes + 1} gravações em lote)"
+        )
+
+        stored = Motoboy.objects.filter(id__in=ids, last_location_update=clock).count()
+        style = self.style.SUCCESS if pings / elapsed >= required and stored == len(ids) else self.style.ERROR
+        self.stdout.write(style(
+            f"Necessário: {required:,.0f} pings/s ({len(ids)} motoboys a cada {options['interval']} s); "
+            f"{stored} de {len(ids)} posições finais gravadas no banco"
+        ))
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from motoboys.spatial import RiderGrid, NEAREST_CELL_KM
+from orders.delivery import RESTAURANT_COORDS, haversine_km
+from orders.views import calculate_straight_line_distance
+import numpy as np
+import time
+
+
+class Command(BaseCommand):
+    help = 'Compara a busca dos k motoboys mais próximos: varredura da frota x grade espacial (em memória, sem banco)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--riders', type=int, default=10000, help='Motoboys disponíveis')
+        parser.add_argument('--queries', type=int, default=1000, help='Buscas por método')
+        parser.add_argument('--k', type=int, default=5, help='Motoboys por busca')
+        parser.add_argument('--radius', type=float, default=5.0, help='Raio máximo (km)')
+        parser.add_argument('--spread-km', type=float, default=8.0,
+                            help='Desvio padrão das posições em torno do restaurante')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        degrees = options['spread_km'] / 111.32
+        count, k, radius = options['riders'], options['k'], options['radius']
+
+        latitudes = RESTAURANT_COORDS['lat'] + rng.normal(0, degrees, count)
+        longitudes = RESTAURANT_COORDS['lng'] + rng.normal(0, degrees, count)
+        points = list(zip(
+            (RESTAURANT_COORDS['lat'] + rng.normal(0, degrees, options['queries'])).tolist(),
+            (RESTAURANT_COORDS['lng'] + rng.normal(0, degrees, options['queries'])).tolist(),
+        ))
+
+        def brute_force(latitude, longitude):
+            distances = haversine_km(latitude, longitude, latitudes, longitudes)
+            inside = np.flatnonzero(distances <= radius)
+            best = inside[np.argsort(distances[inside], kind='stable')[:k]]
+            return best, distances[best]
+
+        # Antes: laço em Python sobre a frota inteira (poucas buscas, é lento)
+        loop_queries = points[:max(1, min(len(points), 20))]
+        rider_list = list(zip(latitudes.tolist(), longitudes.tolist()))
+        start = time.perf_counter()
+        for latitude, longitude in loop_queries:
+            distances = [calculate_straight_line_distance(latitude, longitude, lat, lng) for lat, lng in rider_list]
+            sorted((d, i) for i, d in enumerate(distances) if d <= radius)[:k]
+        loop_ms = (time.perf_counter() - start) / len(loop_queries) * 1000
+
+        start = time.perf_counter()
+        expected = [brute_force(latitude, longitude) for latitude, longitude in points]
+        brute_ms = (time.perf_counter() - start) / len(points) * 1000
+
+        start = time.perf_counter()
+        grid = RiderGrid(range(count), latitudes, longitudes, cell_km=NEAREST_CELL_KM)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        results = [grid.nearest(latitude, longitude, k, radius) for latitude, longitude in points]
+        grid_ms = (time.perf_counter() - start) / len(points) * 1000
+
+        mismatches = sum(
+            not np.allclose(np.sort(expected_distances), distances)
+            for (_, expected_distances), (_, distances) in zip(expected, results)
+        )
+        found = sum(len(indexes) for indexes, _ in results) / len(results)
+
+        self.stdout.write(f"{count} motoboys, k={k}, raio {radius} km, {len(points)} buscas ({found:.1f} motoboys por busca)")
+        self.stdout.write(f"Laço em Python (antes)   {loop_ms:>9.3f} ms por busca")
+        self.stdout.write(f"Varredura numpy          {brute_ms:>9.3f} ms por busca")
+        self.stdout.write(f"Grade ({NEAREST_CELL_KM} km)           {grid_ms:>9.3f} ms por busca (montagem {build_ms:.1f} ms)")
+        style = self.style.SUCCESS if not mismatches else self.style.ERROR
+        self.stdout.write(style(f"{len(points) - mismatches} de {len(points)} buscas iguais à varredura completa"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from motoboys.tracks import purge_tracks
+import time
+
+
+class Command(BaseCommand):
+    help = 'Apaga os trechos de trajeto dos motoboys mais velhos que a retenção'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=None,
+                            help='Dias de trajeto mantidos (padrão: settings.LOCATION_TRACK_RETENTION_DAYS)')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Se informado, repete a limpeza a cada N segundos')
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = purge_tracks(options['retention_days'])
+            self.stdout.write(self.style.SUCCESS(f'{deleted} trecho(s) de trajeto removido(s)'))
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
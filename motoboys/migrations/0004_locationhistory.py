@@ -0,0 +1,30 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motoboys', '0003_motoboy_device_ids'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('latitude', models.DecimalField(decimal_places=6, max_digits=9, verbose_name='Latitude')),
+                ('longitude', models.DecimalField(decimal_places=6, max_digits=9, verbose_name='Longitude')),
+                ('recorded_at', models.DateTimeField(verbose_name='Horário da posição')),
+                ('motoboy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_history', to='motoboys.motoboy', verbose_name='Motoboy')),
+            ],
+            options={
+                'verbose_name': 'Histórico de Localização',
+                'verbose_name_plural': 'Históricos de Localização',
+                'ordering': ['motoboy', 'recorded_at'],
+                'constraints': [models.UniqueConstraint(fields=('motoboy', 'recorded_at'), name='location_history_motoboy_time')],
+            },
+        ),
+    ]
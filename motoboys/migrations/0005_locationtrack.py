@@ -0,0 +1,135 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:03
+
+import django.db.models.deletion
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+from django.db import migrations, models
+import numpy as np
+import struct
+import zlib
+
+# Formato do trecho na época desta migration (copiado de motoboys.tracks: esta migration
+# não deve mudar com o app)
+TRACK_WINDOW_MS = 15 * 60 * 1000
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<BI')
+MICRODEGREES = 1_000_000
+
+
+def to_ms(moment):
+    return int(round(moment.timestamp() * 1000))
+
+
+def from_ms(milliseconds):
+    return datetime.fromtimestamp(milliseconds / 1000, tz=dt_timezone.utc)
+
+
+def encode_chunk(offsets_ms, latitudes_micro, longitudes_micro):
+    """Colunas int32 em diferenças para o ponto anterior, comprimidas com zlib"""
+    columns = np.vstack([offsets_ms, latitudes_micro, longitudes_micro]).astype(np.int64)
+    deltas = np.diff(columns, axis=1, prepend=0).astype('<i4')
+    return HEADER.pack(FORMAT_VERSION, columns.shape[1]) + zlib.compress(deltas.tobytes())
+
+
+def decode_chunk(data):
+    data = bytes(data)
+    version, count = HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Formato de trecho desconhecido: {version}')
+    deltas = np.frombuffer(zlib.decompress(data[HEADER.size:]), dtype='<i4').reshape(3, count)
+    offsets, latitudes, longitudes = np.cumsum(deltas, axis=1, dtype=np.int64)
+    return offsets, latitudes, longitudes
+
+
+def sort_points(offsets_ms, latitudes_micro, longitudes_micro):
+    """Ordena por horário e descarta horários repetidos (fica o primeiro)"""
+    offsets_ms, first = np.unique(offsets_ms, return_index=True)
+    return offsets_ms, latitudes_micro[first], longitudes_micro[first]
+
+
+def history_to_tracks(apps, schema_editor):
+    """Agrupa o histórico linha-a-linha em trechos por motoboy e janela"""
+    LocationHistory = apps.get_model('motoboys', 'LocationHistory')
+    LocationTrack = apps.get_model('motoboys', 'LocationTrack')
+
+    groups = {}
+    rows = LocationHistory.objects.order_by('motoboy_id', 'recorded_at').values_list(
+        'motoboy_id', 'recorded_at', 'latitude', 'longitude'
+    )
+    for motoboy_id, recorded_at, latitude, longitude in rows.iterator():
+        milliseconds = to_ms(recorded_at)
+        window = milliseconds // TRACK_WINDOW_MS * TRACK_WINDOW_MS
+        groups.setdefault((motoboy_id, window), []).append((
+            milliseconds - window, round(latitude * MICRODEGREES), round(longitude * MICRODEGREES)
+        ))
+
+    tracks = []
+    for (motoboy_id, window), points in groups.items():
+        offsets, latitudes, longitudes = sort_points(*np.array(points, dtype=np.int64).T)
+        tracks.append(LocationTrack(
+            motoboy_id=motoboy_id,
+            window_start=from_ms(window),
+            point_count=len(offsets),
+            first_at=from_ms(window + int(offsets[0])),
+            last_at=from_ms(window + int(offsets[-1])),
+            data=encode_chunk(offsets, latitudes, longitudes),
+        ))
+    LocationTrack.objects.bulk_create(tracks, batch_size=500)
+
+
+def tracks_to_history(apps, schema_editor):
+    """Volta os trechos para uma linha por posição"""
+    LocationHistory = apps.get_model('motoboys', 'LocationHistory')
+    LocationTrack = apps.get_model('motoboys', 'LocationTrack')
+
+    for motoboy_id, window_start, data in LocationTrack.objects.values_list('motoboy_id', 'window_start', 'data').iterator():
+        offsets, latitudes, longitudes = decode_chunk(data)
+        window = to_ms(window_start)
+        LocationHistory.objects.bulk_create([
+            LocationHistory(
+                motoboy_id=motoboy_id,
+                latitude=Decimal(latitude) / MICRODEGREES,
+                longitude=Decimal(longitude) / MICRODEGREES,
+                recorded_at=from_ms(window + offset),
+            )
+            for offset, latitude, longitude in zip(offsets.tolist(), latitudes.tolist(), longitudes.tolist())
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motoboys', '0004_locationhistory'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LocationTrack',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_start', models.DateTimeField(verbose_name='Início da janela')),
+                ('point_count', models.PositiveIntegerField(verbose_name='Número de posições')),
+                ('first_at', models.DateTimeField(verbose_name='Primeira posição')),
+                ('last_at', models.DateTimeField(verbose_name='Última posição')),
+                ('data', models.BinaryField(verbose_name='Posições codificadas')),
+                ('motoboy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='location_tracks', to='motoboys.motoboy', verbose_name='Motoboy')),
+            ],
+            options={
+                'verbose_name': 'Trajeto',
+                'verbose_name_plural': 'Trajetos',
+                'ordering': ['motoboy', 'window_start'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='locationtrack',
+            index=models.Index(fields=['window_start'], name='location_track_window_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='locationtrack',
+            constraint=models.UniqueConstraint(fields=('motoboy', 'window_start'), name='location_track_motoboy_window'),
+        ),
+        migrations.RunPython(history_to_tracks, tracks_to_history),
+        migrations.DeleteModel(
+            name='LocationHistory',
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_devices(apps, schema_editor):
+    """Cria um MotoboyDevice para cada id em Motoboy.device_ids.
+
+    Se o mesmo aparelho aparece em mais de um motoboy, fica com o cadastro mais novo,
+    que era quem a busca antiga (ordenada por -created_at) encontrava primeiro.
+    """
+    Motoboy = apps.get_model('motoboys', 'Motoboy')
+    MotoboyDevice = apps.get_model('motoboys', 'MotoboyDevice')
+
+    devices = {}
+    for motoboy_id, device_ids in Motoboy.objects.order_by('-created_at').values_list('id', 'device_ids').iterator():
+        for device_id in device_ids or []:
+            if isinstance(device_id, str) and device_id and device_id not in devices:
+                devices[device_id] = motoboy_id
+
+    MotoboyDevice.objects.bulk_create(
+        [MotoboyDevice(motoboy_id=motoboy_id, device_id=device_id) for device_id, motoboy_id in devices.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motoboys', '0005_locationtrack'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MotoboyDevice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('device_id', models.CharField(max_length=255, unique=True, verbose_name='ID do dispositivo')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data de cadastro')),
+                ('motoboy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='devices', to='motoboys.motoboy', verbose_name='Motoboy')),
+            ],
+            options={
+                'verbose_name': 'Dispositivo',
+                'verbose_name_plural': 'Dispositivos',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RunPython(backfill_devices, migrations.RunPython.noop),
+    ]
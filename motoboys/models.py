@@ -78,13 +78,17 @@ class Motoboy(models.Model):
             raise ValidationError("Avaliação deve estar entre 0 e 5")
     
     def get_current_location(self):
-        """Retorna a localização atual como tupla"""
+        """Retorna a localização atual como tupla (buffer de pings primeiro, depois o banco)"""
+        from .locations import get_buffered_location
+        buffered = get_buffered_location(self.id)
+        if buffered:
+            return (buffered[0], buffered[1])
         if self.current_latitude and self.current_longitude:
             return (float(self.current_latitude), float(self.current_longitude))
         return None
     
     def update_location(self, latitude, longitude):
-        """Atualiza a localização atual"""
+        """Atualiza a localização atual na hora (pings do app passam por locations.record_location)"""
         from django.utils import timezone
         self.current_latitude = latitude
         self.current_longitude = longitude
@@ -105,3 +109,48 @@ class Motoboy(models.Model):
         """Retorna o status em português"""
         status_dict = dict(self.STATUS_CHOICES)
         return status_dict.get(self.status, self.status)
+
+
+class LocationTrack(models.Model):
+    """Trecho do trajeto de um motoboy: todas as posições de uma janela de tempo num blob compacto.
+
+    O formato do campo ``data`` está em motoboys.tracks (deltas int32 comprimidos).
+    """
+
+    motoboy = models.ForeignKey(Motoboy, on_delete=models.CASCADE, related_name='location_tracks', verbose_name="Motoboy")
+    window_start = models.DateTimeField(verbose_name="Início da janela")
+    point_count = models.PositiveIntegerField(verbose_name="Número de posições")
+    first_at = models.DateTimeField(verbose_name="Primeira posição")
+    last_at = models.DateTimeField(verbose_name="Última posição")
+    data = models.BinaryField(verbose_name="Posições codificadas")
+
+    class Meta:
+        verbose_name = "Trajeto"
+        verbose_name_plural = "Trajetos"
+        ordering = ['motoboy', 'window_start']
+        constraints = [
+            models.UniqueConstraint(fields=['motoboy', 'window_start'], name='location_track_motoboy_window'),
+        ]
+        indexes = [
+            # Retenção apaga trechos inteiros pela janela
+            models.Index(fields=['window_start'], name='location_track_window_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.motoboy.full_name} @ {self.window_start:%d/%m/%Y %H:%M} ({self.point_count} posições)"
+
+
+class MotoboyDevice(models.Model):
+    """Dispositivo associado a um motoboy (um aparelho pertence a um único motoboy)"""
+
+    motoboy = models.ForeignKey(Motoboy, on_delete=models.CASCADE, related_name='devices', verbose_name="Motoboy")
+    device_id = models.CharField(max_length=255, unique=True, verbose_name="ID do dispositivo")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data de cadastro")
+
+    class Meta:
+        verbose_name = "Dispositivo"
+        verbose_name_plural = "Dispositivos"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.device_id} ({self.motoboy.full_name})"
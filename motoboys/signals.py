@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .devices import invalidate_device
+from .models import MotoboyDevice
+
+
+@receiver(post_save, sender=MotoboyDevice)
+@receiver(post_delete, sender=MotoboyDevice)
+def invalidate_device_cache(sender, instance, **kwargs):
+    """Tira o dispositivo do cache de check-device quando a associação muda ou é apagada"""
+    invalidate_device(instance.device_id)
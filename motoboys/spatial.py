@@ -0,0 +1,181 @@
+from django.conf import settings
+from django.utils import timezone
+from orders.delivery import haversine_km
+import math
+import numpy as np
+import threading
+import time
+
+# Quilômetros por grau de latitude (aproximação esférica)
+KM_PER_DEGREE = 111.32
+
+# Lado da célula da grade de motoboys disponíveis (km)
+NEAREST_CELL_KM = 1.0
+
+
+class RiderGrid:
+    """Grade uniforme em memória sobre as posições dos motoboys.
+
+    Cada motoboy cai numa célula de ``cell_km`` x ``cell_km``; uma busca por raio só
+    calcula distância para quem está nas células que cobrem o círculo, em vez da frota
+    inteira. A largura da célula em longitude usa a latitude média da frota.
+    """
+
+    def __init__(self, ids, latitudes, longitudes, cell_km=1.0):
+        self.ids = list(ids)
+        self.latitudes = np.asarray(latitudes, dtype=np.float64)
+        self.longitudes = np.asarray(longitudes, dtype=np.float64)
+        self.cell_km = cell_km
+
+        reference_lat = float(self.latitudes.mean()) if len(self.latitudes) else 0.0
+        self.cell_lat = cell_km / KM_PER_DEGREE
+        self.cell_lng = cell_km / (KM_PER_DEGREE * max(math.cos(math.radians(reference_lat)), 0.01))
+
+        rows = np.floor(self.latitudes / self.cell_lat).astype(np.int64)
+        cols = np.floor(self.longitudes / self.cell_lng).astype(np.int64)
+        cells = {}
+        for index, cell in enumerate(zip(rows.tolist(), cols.tolist())):
+            cells.setdefault(cell, []).append(index)
+        self.cells = {cell: np.array(indexes, dtype=np.int64) for cell, indexes in cells.items()}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def cell_of(self, latitude, longitude):
+        """Célula (linha, coluna) de um ponto"""
+        return math.floor(latitude / self.cell_lat), math.floor(longitude / self.cell_lng)
+
+    def within(self, latitude, longitude, radius_km):
+        """Índices e distâncias (km, linha reta) dos motoboys a até ``radius_km`` do ponto"""
+        row, col = self.cell_of(latitude, longitude)
+        row_span = math.ceil(radius_km / self.cell_km)
+        # Graus de longitude encolhem com a latitude do ponto consultado
+        col_span = math.ceil(
+            radius_km / (self.cell_lng * KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01))
+        )
+
+        buckets = [
+            self.cells[cell]
+            for cell in (
+                (r, c)
+                for r in range(row - row_span, row + row_span + 1)
+                for c in range(col - col_span, col + col_span + 1)
+            )
+            if cell in self.cells
+        ]
+        if not buckets:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        indexes = np.concatenate(buckets)
+        distances = haversine_km(latitude, longitude, self.latitudes[indexes], self.longitudes[indexes])
+        inside = distances <= radius_km
+        return indexes[inside], distances[inside]
+
+    def nearest(self, latitude, longitude, k, radius_km):
+        """Os ``k`` motoboys mais próximos a até ``radius_km``: índices e distâncias em ordem crescente.
+
+        Percorre anéis de células a partir da célula do ponto e para quando nenhum anel
+        seguinte pode ter alguém mais perto que o k-ésimo encontrado; o custo acompanha
+        o resultado e a densidade em volta do ponto, não o tamanho da frota.
+        """
+        found_indexes = np.empty(0, dtype=np.int64)
+        found_distances = np.empty(0, dtype=np.float64)
+        if k <= 0 or not len(self.ids):
+            return found_indexes, found_distances
+
+        row, col = self.cell_of(latitude, longitude)
+        cell_width_km = self.cell_lng * KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 0.01)
+        shortest_side_km = min(self.cell_km, cell_width_km)
+        last_ring = max(math.ceil(radius_km / self.cell_km), math.ceil(radius_km / cell_width_km))
+
+        for ring in range(last_ring + 1):
+            buckets = [self.cells[cell] for cell in self._ring(row, col, ring) if cell in self.cells]
+            if buckets:
+                indexes = np.concatenate(buckets)
+                distances = haversine_km(latitude, longitude, self.latitudes[indexes], self.longitudes[indexes])
+                inside = distances <= radius_km
+                found_indexes = np.concatenate([found_indexes, indexes[inside]])
+                found_distances = np.concatenate([found_distances, distances[inside]])
+                if len(found_distances) > k:
+                    keep = np.argpartition(found_distances, k - 1)[:k]
+                    found_indexes, found_distances = found_indexes[keep], found_distances[keep]
+
+            # Quem está além deste anel fica a pelo menos ring * lado da célula do ponto
+            if len(found_distances) == k and found_distances.max() <= ring * shortest_side_km:
+                break
+
+        order = np.argsort(found_distances, kind='stable')
+        return found_indexes[order], found_distances[order]
+
+    @staticmethod
+    def _ring(row, col, ring):
+        """Células na borda do quadrado de ``ring`` células em volta de (row, col)"""
+        if ring == 0:
+            return [(row, col)]
+        cells = [(row - ring, c) for c in range(col - ring, col + ring + 1)]
+        cells += [(row + ring, c) for c in range(col - ring, col + ring + 1)]
+        cells += [(r, col - ring) for r in range(row - ring + 1, row + ring)]
+        cells += [(r, col + ring) for r in range(row - ring + 1, row + ring)]
+        return cells
+
+
+# Grade dos motoboys disponíveis em memória: (montada em, grade)
+_available_grid = None
+_grid_lock = threading.Lock()
+
+
+def available_rider_grid(now=None):
+    """Grade dos motoboys disponíveis com posição recente, remontada no máximo a cada RIDER_GRID_TTL_SECONDS.
+
+    Uma consulta (ids e posições) por remontagem; posições ainda no buffer de pings
+    têm precedência sobre as gravadas no banco.
+    """
+    from .locations import LOCATION_MAX_AGE, get_buffered_locations
+    from .models import Motoboy
+    global _available_grid
+
+    ttl = getattr(settings, 'RIDER_GRID_TTL_SECONDS', 5)
+    with _grid_lock:
+        if _available_grid and time.monotonic() - _available_grid[0] < ttl:
+            return _available_grid[1]
+
+        now = now or timezone.now()
+        riders = list(
+            Motoboy.objects.filter(
+                status='available',
+                is_active=True,
+                current_latitude__isnull=False,
+                current_longitude__isnull=False,
+                last_location_update__gte=now - LOCATION_MAX_AGE,
+            ).values_list('id', 'current_latitude', 'current_longitude')
+        )
+        buffered = get_buffered_locations([rider[0] for rider in riders])
+        positions = [buffered.get(motoboy_id, (latitude, longitude)) for motoboy_id, latitude, longitude in riders]
+
+        grid = RiderGrid(
+            [rider[0] for rider in riders],
+            [float(position[0]) for position in positions],
+            [float(position[1]) for position in positions],
+            cell_km=NEAREST_CELL_KM,
+        )
+        _available_grid = (time.monotonic(), grid)
+        return grid
+
+
+def nearest_available_riders(latitude, longitude, k=5, radius_km=5.0):
+    """Os ``k`` motoboys disponíveis mais próximos do ponto, a até ``radius_km`` em linha reta.
+
+    Retorna [{'motoboy_id', 'latitude', 'longitude', 'distance_km'}] do mais perto ao
+    mais longe.
+    """
+    grid = available_rider_grid()
+    indexes, distances = grid.nearest(latitude, longitude, k, radius_km)
+    return [
+        {
+            'motoboy_id': grid.ids[index],
+            'latitude': float(grid.latitudes[index]),
+            'longitude': float(grid.longitudes[index]),
+            'distance_km': round(float(distance), 3),
+        }
+        for index, distance in zip(indexes.tolist(), distances.tolist())
+    ]
@@ -1,3 +1,70 @@
-from django.test import TestCase
+from django.db import connection
+from django.test import TransactionTestCase
+from orders.models import Order
+from users.models import User
+from .models import Motoboy
+import threading
 
-# Create your tests here.
+
+class AcceptOrderConcurrencyTests(TransactionTestCase):
+    """Aceite de pedido com vários motoboys ao mesmo tempo"""
+
+    RIDERS = 16
+
+    def setUp(self):
+        customer = User.objects.create(username='cliente@x.com', email='cliente@x.com')
+        self.order = Order.objects.create(
+            customer=customer,
+            pickup_address='Restaurante',
+            delivery_address='Rua 1000',
+            description='Pedido',
+            base_price=10,
+        )
+        self.motoboys = []
+        for i in range(self.RIDERS):
+            user = User.objects.create(username=f'moto{i}@x.com', email=f'moto{i}@x.com')
+            self.motoboys.append(Motoboy.objects.create(
+                user=user,
+                full_name=f'Motoboy {i}',
+                phone_number='+351900000000',
+                document_type='cnh',
+                document_number=f'DOC{i}',
+                vehicle_model='CG 160',
+                vehicle_plate=f'AA-{i:02d}-BB',
+                vehicle_year=2020,
+                vehicle_color='Preta',
+                status='available',
+            ))
+
+    def test_exactly_one_rider_wins(self):
+        barrier = threading.Barrier(self.RIDERS)
+        results = {}
+
+        def accept(motoboy):
+            try:
+                barrier.wait()
+                results[motoboy.id] = Order.accept_pending(self.order.id, motoboy)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=accept, args=(motoboy,)) for motoboy in self.motoboys]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        winners = [motoboy_id for motoboy_id, won in results.items() if won]
+        self.assertEqual(len(results), self.RIDERS)
+        self.assertEqual(len(winners), 1)
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'accepted')
+        self.assertEqual(self.order.motoboy_id, winners[0])
+        self.assertIsNotNone(self.order.accepted_at)
+
+    def test_accepted_order_cannot_be_taken(self):
+        self.assertTrue(Order.accept_pending(self.order.id, self.motoboys[0]))
+        self.assertFalse(Order.accept_pending(self.order.id, self.motoboys[1]))
+
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.motoboy_id, self.motoboys[0].id)
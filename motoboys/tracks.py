@@ -0,0 +1,181 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+import numpy as np
+import struct
+import uuid
+import zlib
+
+# Cada LocationTrack guarda todas as posições de um motoboy nesta janela de tempo
+TRACK_WINDOW = timedelta(minutes=15)
+TRACK_WINDOW_MS = int(TRACK_WINDOW.total_seconds() * 1000)
+
+# Cabeçalho do trecho: versão do formato e número de pontos
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<BI')
+
+MICRODEGREES = 1_000_000
+
+
+def to_ms(moment):
+    """datetime -> epoch em milissegundos"""
+    return int(round(moment.timestamp() * 1000))
+
+
+def from_ms(milliseconds):
+    """Epoch em milissegundos -> datetime UTC"""
+    return datetime.fromtimestamp(milliseconds / 1000, tz=dt_timezone.utc)
+
+
+def encode_chunk(offsets_ms, latitudes_micro, longitudes_micro):
+    """Codifica pontos já ordenados por horário num trecho binário.
+
+    Três colunas int32 little-endian (ms desde o início da janela, latitude e longitude
+    em micrograus), cada uma guardada como diferença para o ponto anterior e comprimida
+    com zlib. Motoboy parado ou andando devagar vira quase só zeros.
+    """
+    columns = np.vstack([offsets_ms, latitudes_micro, longitudes_micro]).astype(np.int64)
+    deltas = np.diff(columns, axis=1, prepend=0).astype('<i4')
+    return _HEADER.pack(FORMAT_VERSION, columns.shape[1]) + zlib.compress(deltas.tobytes())
+
+
+def decode_chunk(data):
+    """Inverso de encode_chunk: (offsets_ms, latitudes_micro, longitudes_micro) em int64"""
+    data = bytes(data)
+    version, count = _HEADER.unpack_from(data)
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Formato de trecho desconhecido: {version}')
+    deltas = np.frombuffer(zlib.decompress(data[_HEADER.size:]), dtype='<i4').reshape(3, count)
+    offsets, latitudes, longitudes = np.cumsum(deltas, axis=1, dtype=np.int64)
+    return offsets, latitudes, longitudes
+
+
+def merge_chunk(existing, offsets_ms, latitudes_micro, longitudes_micro):
+    """Junta pontos novos a um trecho (ou None/vazio) e devolve as colunas ordenadas e sem horário repetido.
+
+    No mesmo horário vale o ponto que já estava gravado.
+    """
+    if existing:
+        old = decode_chunk(existing)
+        offsets_ms = np.concatenate([old[0], offsets_ms])
+        latitudes_micro = np.concatenate([old[1], latitudes_micro])
+        longitudes_micro = np.concatenate([old[2], longitudes_micro])
+    offsets_ms, first = np.unique(offsets_ms, return_index=True)
+    return offsets_ms, latitudes_micro[first], longitudes_micro[first]
+
+
+def append_points(motoboy_ids, timestamps_ms, latitudes, longitudes):
+    """Acrescenta posições (de um ou vários motoboys) aos trechos das janelas correspondentes.
+
+    Uma transação com três comandos, independente de quantos pontos: cria vazias as
+    janelas que ainda não existem (ignorando as que já existem), lê todas com
+    select_for_update e grava o resultado num único upsert. Como a linha existe
+    antes do bloqueio, dois uploads simultâneos para uma janela nova se enfileiram em
+    vez de um sobrescrever os pontos do outro. Retorna quantos trechos foram gravados.
+    """
+    from .models import LocationTrack
+
+    timestamps_ms = np.asarray(timestamps_ms, dtype=np.int64)
+    if not len(timestamps_ms):
+        return 0
+    motoboy_ids = [motoboy_id if isinstance(motoboy_id, uuid.UUID) else uuid.UUID(str(motoboy_id))
+                   for motoboy_id in motoboy_ids]
+    latitudes_micro = np.round(np.asarray(latitudes, dtype=np.float64) * MICRODEGREES).astype(np.int64)
+    longitudes_micro = np.round(np.asarray(longitudes, dtype=np.float64) * MICRODEGREES).astype(np.int64)
+    windows = timestamps_ms // TRACK_WINDOW_MS * TRACK_WINDOW_MS
+
+    groups = {}
+    for index, key in enumerate(zip(motoboy_ids, windows.tolist())):
+        groups.setdefault(key, []).append(index)
+    window_starts = {window: from_ms(window) for window in set(windows.tolist())}
+
+    with transaction.atomic():
+        # Trecho vazio (0 pontos) só existe dentro desta transação, até o upsert abaixo
+        LocationTrack.objects.bulk_create([
+            LocationTrack(
+                motoboy_id=motoboy_id,
+                window_start=window_starts[window],
+                point_count=0,
+                first_at=window_starts[window],
+                last_at=window_starts[window],
+                data=b'',
+            )
+            for motoboy_id, window in groups
+        ], ignore_conflicts=True)
+
+        existing = {
+            (motoboy_id, to_ms(window_start)): data
+            for motoboy_id, window_start, data in LocationTrack.objects.select_for_update().filter(
+                motoboy_id__in=set(motoboy_ids), window_start__in=list(window_starts.values())
+            ).values_list('motoboy_id', 'window_start', 'data')
+        }
+
+        merged = []
+        for (motoboy_id, window), indexes in groups.items():
+            offsets, lats, lngs = merge_chunk(
+                existing[(motoboy_id, window)],
+                timestamps_ms[indexes] - window,
+                latitudes_micro[indexes],
+                longitudes_micro[indexes],
+            )
+            merged.append(LocationTrack(
+                motoboy_id=motoboy_id,
+                window_start=window_starts[window],
+                point_count=len(offsets),
+                first_at=from_ms(window + int(offsets[0])),
+                last_at=from_ms(window + int(offsets[-1])),
+                data=encode_chunk(offsets, lats, lngs),
+            ))
+
+        # As linhas já existem e estão travadas: o upsert só atualiza
+        LocationTrack.objects.bulk_create(
+            merged,
+            update_conflicts=True,
+            unique_fields=['motoboy', 'window_start'],
+            update_fields=['point_count', 'first_at', 'last_at', 'data'],
+        )
+    return len(merged)
+
+
+def track_points(motoboy_id, start, end):
+    """Trajeto do motoboy entre ``start`` e ``end`` (inclusive).
+
+    Só lê e decodifica os trechos cujas janelas cruzam o intervalo. Retorna
+    (timestamps_ms, latitudes, longitudes) como arrays numpy, em ordem cronológica.
+    """
+    from .models import LocationTrack
+
+    chunks = LocationTrack.objects.filter(
+        motoboy_id=motoboy_id,
+        window_start__gt=start - TRACK_WINDOW,
+        window_start__lte=end,
+    ).order_by('window_start').values_list('window_start', 'data')
+
+    timestamps, latitudes, longitudes = [], [], []
+    for window_start, data in chunks:
+        offsets, lats, lngs = decode_chunk(data)
+        timestamps.append(to_ms(window_start) + offsets)
+        latitudes.append(lats)
+        longitudes.append(lngs)
+    if not timestamps:
+        return np.empty(0, dtype=np.int64), np.empty(0), np.empty(0)
+
+    timestamps = np.concatenate(timestamps)
+    inside = (timestamps >= to_ms(start)) & (timestamps <= to_ms(end))
+    return (
+        timestamps[inside],
+        np.concatenate(latitudes)[inside] / MICRODEGREES,
+        np.concatenate(longitudes)[inside] / MICRODEGREES,
+    )
+
+
+def purge_tracks(retention_days=None, now=None):
+    """Apaga os trechos inteiramente mais velhos que a retenção; retorna quantos"""
+    from .models import LocationTrack
+
+    retention_days = retention_days or getattr(settings, 'LOCATION_TRACK_RETENTION_DAYS', 90)
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    # A janela inteira precisa ter terminado antes do corte
+    deleted, _ = LocationTrack.objects.filter(window_start__lte=cutoff - TRACK_WINDOW).delete()
+    return deleted
@@ -13,7 +13,11 @@ urlpatterns = [
     path('profile/', views.motoboy_profile, name='profile'),
     path('orders/', views.motoboy_orders, name='orders'),
     path('update-location/', views.update_motoboy_location, name='update_location'),
+    path('update-location/batch/', views.upload_motoboy_locations, name='upload_locations'),
+    path('nearby/', views.nearby_riders, name='nearby_riders'),
     path('update-status/', views.update_motoboy_status, name='update_status'),
     path('accept-order/', views.accept_order, name='accept_order'),
+    path('offers/current/', views.current_offer, name='current_offer'),
+    path('offers/respond/', views.respond_offer, name='respond_offer'),
     path('update-order-status/', views.update_order_status, name='update_order_status'),
 ]
@@ -8,7 +8,11 @@ from django.views.decorators.http import require_http_methods
 from django.db.models import Q
 from django.conf import settings
 from .models import Motoboy
+from .locations import record_location, record_fixes, motoboy_exists
+from .spatial import nearest_available_riders
+from .devices import find_device_motoboy, register_device
 from orders.models import Order
+from orders.dispatch import get_open_offer, respond_to_offer
 from users.models import User
 import json
 import hashlib
@@ -83,32 +87,10 @@ def motoboy_login(request):
                     # Salva o device_id se fornecido
                     if device_id:
                         try:
-                            print(f"=== DEBUG SALVAR DEVICE_ID ===")
-                            print(f"Device ID a salvar: {device_id}")
-                            print(f"Tipo do device_id: {type(device_id)}")
-                            print(f"Device IDs atuais: {motoboy.device_ids}")
-                            print(f"Tipo dos device_ids: {type(motoboy.device_ids)}")
-                            
-                            current_device_ids = motoboy.device_ids or []
-                            print(f"Lista atual: {current_device_ids}")
-                            print(f"Tipo da lista: {type(current_device_ids)}")
-                            
-                            if device_id not in current_device_ids:
-                                current_device_ids.append(device_id)
-                                print(f"Nova lista: {current_device_ids}")
-                                motoboy.device_ids = current_device_ids
-                                motoboy.save()
-                                print(f"✅ Device ID {device_id} salvo para motoboy {motoboy.full_name}")
-                                print(f"✅ Device IDs finais: {motoboy.device_ids}")
-                            else:
-                                print(f"⚠️ Device ID {device_id} já existe para motoboy {motoboy.full_name}")
-                            print(f"===============================")
+                            register_device(motoboy, device_id)
+                            print(f"✅ Device ID {device_id} salvo para motoboy {motoboy.full_name}")
                         except Exception as e:
                             print(f"❌ Erro ao salvar device_id: {e}")
-                            print(f"❌ Tipo do erro: {type(e)}")
-                            import traceback
-                            traceback.print_exc()
-                            pass
                     else:
                         print(f"⚠️ Nenhum device_id fornecido para salvar")
                     
@@ -281,89 +263,18 @@ def generate_device_id(request):
     return device_hash
 
 def check_existing_device_registration(device_id, request):
-    """Verifica se já existe um cadastro para este dispositivo"""
-    
-    print(f"🚀 === INICIANDO CHECK_EXISTING_DEVICE_REGISTRATION ===")
-    print(f"🔍 PARÂMETROS RECEBIDOS:")
-    print(f"  device_id: {device_id}")
-    print(f"  Tipo do device_id: {type(device_id)}")
-    print(f"  Tamanho: {len(device_id) if device_id else 0}")
-    print(f"  Request: {request}")
-    
-    # 1. Verifica se já existe um motoboy com este device_id
+    """Verifica se já existe um cadastro para este dispositivo (cache ou consulta pelo índice único)"""
     try:
-        print(f"🔍 INICIANDO BUSCA NO BANCO...")
-        
-        # SQLite não suporta contains em JSONField, vamos usar uma abordagem diferente
-        motoboys = Motoboy.objects.all()
-        total_motoboys = motoboys.count()
-        print(f"📊 TOTAL DE MOTOBOYS NO BANCO: {total_motoboys}")
-        
-        if total_motoboys == 0:
-            print(f"❌ NENHUM MOTOBOY NO BANCO!")
-            print(f"🚀 === FIM CHECK_EXISTING_DEVICE_REGISTRATION (BANCO VAZIO) ====")
-            return None
-        
-        print(f"🔍 VERIFICANDO CADA MOTOBOY...")
-        
-        for i, motoboy in enumerate(motoboys):
-            print(f"  📋 MOTOBOY {i+1}/{total_motoboys}:")
-            print(f"    Nome: {motoboy.full_name}")
-            print(f"    Email: {motoboy.user.email}")
-            print(f"    Device IDs: {motoboy.device_ids}")
-            print(f"    Tipo dos device_ids: {type(motoboy.device_ids)}")
-            
-            if motoboy.device_ids:
-                print(f"    ✅ TEM DEVICE_IDS, VERIFICANDO...")
-                device_ids_count = len(motoboy.device_ids)
-                print(f"    📊 Total de device_ids: {device_ids_count}")
-                
-                for j, stored_id in enumerate(motoboy.device_ids):
-                    print(f"      🔍 DEVICE_ID {j+1}/{device_ids_count}:")
-                    print(f"        Valor: '{stored_id}'")
-                    print(f"        Tipo: {type(stored_id)}")
-                    print(f"        Tamanho: {len(stored_id) if stored_id else 0}")
-                    print(f"        Comparando com: '{device_id}'")
-                    print(f"        São iguais? {device_id == stored_id}")
-                    print(f"        Comparação detalhada:")
-                    print(f"          device_id == stored_id: {device_id == stored_id}")
-                    print(f"          device_id is stored_id: {device_id is stored_id}")
-                    print(f"          len(device_id) == len(stored_id): {len(device_id) == len(stored_id) if stored_id else False}")
-                    
-                    if device_id == stored_id:
-                        print(f"        🎯 MATCH ENCONTRADO!")
-                        print(f"        ✅ ENCONTROU! Motoboy: {motoboy.full_name}")
-                        print(f"🚀 === FIM CHECK_EXISTING_DEVICE_REGISTRATION (MATCH) ====")
-                        return motoboy
-                    else:
-                        print(f"        ❌ NÃO É IGUAL")
-            else:
-                print(f"    ❌ SEM DEVICE_IDS")
-        
-        print(f"❌ NENHUM MOTOBOY ENCONTRADO COM DEVICE_ID: {device_id}")
-        print(f"📊 RESUMO DA BUSCA:")
-        print(f"  Total de motoboys verificados: {total_motoboys}")
-        print(f"  Device ID procurado: {device_id}")
-        print(f"  Device IDs encontrados no banco:")
-        
-        for motoboy in motoboys:
-            if motoboy.device_ids:
-                for stored_id in motoboy.device_ids:
-                    print(f"    - {stored_id} (de {motoboy.full_name})")
-        
-        print("===============================")
-        print(f"🚀 === FIM CHECK_EXISTING_DEVICE_REGISTRATION (NÃO ENCONTRADO) ====")
-        return None
-        
+        motoboy = find_device_motoboy(device_id)
     except Exception as e:
-        print(f"❌ ERRO AO VERIFICAR DEVICE_ID:")
-        print(f"  Erro: {e}")
-        print(f"  Tipo do erro: {type(e)}")
-        print(f"  Mensagem: {str(e)}")
-        import traceback
-        print(f"  Stack trace: {traceback.format_exc()}")
-        print(f"🚀 === FIM CHECK_EXISTING_DEVICE_REGISTRATION (ERRO) ====")
+        print(f"❌ ERRO AO VERIFICAR DEVICE_ID: {e}")
         return None
+    
+    if motoboy:
+        print(f"🎯 Device ID {device_id} pertence a {motoboy.full_name}")
+    else:
+        print(f"❌ NENHUM MOTOBOY ENCONTRADO COM DEVICE_ID: {device_id}")
+    return motoboy
 
 def check_motoboy_status(request):
     """Verifica se o usuário já tem cadastro de motoboy"""
@@ -457,7 +368,6 @@ def motoboy_register(request):
             # Cria o motoboy
             print(f"🔧 SALVANDO MOTOBOY NO BANCO...")
             print(f"🔧 Device ID a salvar: {device_id}")
-            print(f"🔧 Device IDs array: {[device_id] if device_id else []}")
             
             motoboy = Motoboy.objects.create(
                 user=user,
@@ -470,13 +380,13 @@ def motoboy_register(request):
                 vehicle_year=data['vehicle_year'],
                 vehicle_color=data['vehicle_color'],
                 status='offline',  # Começa offline
-                device_ids=[device_id] if device_id else []  # Salva o device_id
             )
+            if device_id:
+                register_device(motoboy, device_id)
             
             print(f"✅ MOTOBOY SALVO COM SUCESSO!")
             print(f"✅ ID do motoboy: {motoboy.id}")
             print(f"✅ Device IDs salvos: {motoboy.device_ids}")
-            print(f"✅ Tipo dos device_ids: {type(motoboy.device_ids)}")
             
             # Faz login automático
             user = authenticate(username=data['email'], password=data['password'])
@@ -510,12 +420,8 @@ def motoboy_dashboard(request):
         messages.error(request, 'Perfil de motoboy não encontrado.')
         return redirect('motoboy_register')
     
-    # Busca pedidos disponíveis (pendentes)
-    available_orders = Order.objects.filter(
-        status='pending'
-    ).exclude(
-        motoboy__isnull=False
-    ).order_by('-priority', '-created_at')
+    # Busca pedidos disponíveis (pendentes), na ordem de prioridade da fila
+    available_orders = Order.dispatch_queue()
     
     # Busca pedidos do motoboy
     my_orders = Order.objects.filter(
@@ -644,16 +550,6 @@ def accept_order(request):
                 'message': 'Perfil de motoboy não encontrado'
             }, status=404)
         
-        # Busca o pedido
-        try:
-            order = Order.objects.get(id=order_id, status='pending')
-            print(f"Order found: {order.order_number}")
-        except Order.DoesNotExist:
-            return JsonResponse({
-                'success': False,
-                'message': 'Pedido não encontrado ou já foi aceito'
-            }, status=404)
-        
         # Verifica se o motoboy está disponível
         print(f"Motoboy status check: {motoboy.status} == 'available' ? {motoboy.status == 'available'}")
         if motoboy.status != 'available':
@@ -662,10 +558,15 @@ def accept_order(request):
                 'message': f'Você precisa estar disponível para aceitar pedidos. Status atual: {motoboy.status}'
             }, status=400)
         
-        # Aceita o pedido
-        order.motoboy = motoboy
-        order.status = 'accepted'
-        order.save()
+        # Aceita o pedido num UPDATE condicional (só um motoboy ganha a corrida)
+        if not Order.accept_pending(order_id, motoboy):
+            exists = Order.objects.filter(id=order_id).exists()
+            return JsonResponse({
+                'success': False,
+                'message': 'Pedido já foi aceito' if exists else 'Pedido não encontrado'
+            }, status=409 if exists else 404)
+        
+        order = Order.objects.select_related('customer').get(id=order_id)
         
         return JsonResponse({
             'success': True,
@@ -690,6 +591,88 @@ def accept_order(request):
             'message': f'Erro ao aceitar pedido: {str(e)}'
         }, status=500)
 
+@login_required
+def current_offer(request):
+    """Oferta do despacho automático em aberto para o motoboy logado"""
+    try:
+        motoboy = Motoboy.objects.get(user=request.user)
+    except Motoboy.DoesNotExist:
+        return JsonResponse({
+            'success': False,
+            'message': 'Perfil de motoboy não encontrado'
+        }, status=404)
+    
+    offer = get_open_offer(motoboy)
+    if offer is None:
+        return JsonResponse({'success': True, 'offer': None})
+    
+    return JsonResponse({
+        'success': True,
+        'offer': {
+            'id': offer.id,
+            'order_id': offer.order_id,
+            'order_number': offer.order.order_number,
+            'delivery_address': offer.order.delivery_address,
+            'base_price': float(offer.order.base_price),
+            'priority': offer.order.priority,
+            'distance_km': float(offer.distance_km),
+            'expires_at': offer.expires_at.isoformat(),
+        }
+    })
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def respond_offer(request):
+    """Motoboy aceita ou recusa a oferta do despacho automático"""
+    try:
+        data = json.loads(request.body)
+        offer_id = data.get('offer_id')
+        accept = bool(data.get('accept'))
+        
+        if not offer_id:
+            return JsonResponse({
+                'success': False,
+                'message': 'ID da oferta é obrigatório'
+            }, status=400)
+        
+        try:
+            motoboy = Motoboy.objects.get(user=request.user)
+        except Motoboy.DoesNotExist:
+            return JsonResponse({
+                'success': False,
+                'message': 'Perfil de motoboy não encontrado'
+            }, status=404)
+        
+        result = respond_to_offer(offer_id, motoboy, accept)
+        if result is None:
+            return JsonResponse({
+                'success': False,
+                'message': 'Oferta não encontrada ou já expirou'
+            }, status=404)
+        if result == 'expired':
+            return JsonResponse({
+                'success': False,
+                'message': 'Pedido já foi aceito'
+            }, status=409)
+        if result == 'declined':
+            return JsonResponse({'success': True, 'message': 'Oferta recusada'})
+        
+        return JsonResponse({
+            'success': True,
+            'message': 'Pedido aceito com sucesso!'
+        })
+        
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Dados inválidos'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': f'Erro ao responder oferta: {str(e)}'
+        }, status=500)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def update_order_status(request):
@@ -779,8 +762,25 @@ def update_motoboy_location(request):
                 'message': 'Dados incompletos'
             }, status=400)
         
-        motoboy = get_object_or_404(Motoboy, id=motoboy_id)
-        motoboy.update_location(latitude, longitude)
+        try:
+            latitude = float(latitude)
+            longitude = float(longitude)
+        except (TypeError, ValueError):
+            latitude = longitude = None
+        if latitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return JsonResponse({
+                'success': False,
+                'message': 'Coordenadas inválidas'
+            }, status=400)
+        
+        if not motoboy_exists(motoboy_id):
+            return JsonResponse({
+                'success': False,
+                'message': 'Motoboy não encontrado'
+            }, status=404)
+        
+        # Vai para o buffer; o banco recebe as posições em lote
+        record_location(motoboy_id, latitude, longitude)
         
         return JsonResponse({
             'success': True,
@@ -798,6 +798,104 @@ def update_motoboy_location(request):
             'message': f'Erro ao atualizar localização: {str(e)}'
         }, status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def upload_motoboy_locations(request):
+    """Recebe de uma vez as posições acumuladas pelo app (ex.: depois de ficar sem rede)"""
+    try:
+        data = json.loads(request.body)
+        motoboy_id = data.get('motoboy_id')
+        fixes = data.get('fixes')
+        
+        if not motoboy_id or fixes is None:
+            return JsonResponse({
+                'success': False,
+                'message': 'Dados incompletos'
+            }, status=400)
+        
+        if not motoboy_exists(motoboy_id):
+            return JsonResponse({
+                'success': False,
+                'message': 'Motoboy não encontrado'
+            }, status=404)
+        
+        try:
+            accepted, rejected = record_fixes(motoboy_id, fixes)
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'message': str(e)
+            }, status=400)
+        
+        if not accepted:
+            return JsonResponse({
+                'success': False,
+                'message': 'Nenhuma posição válida no lote',
+                'accepted': 0,
+                'rejected': rejected
+            }, status=400)
+        
+        return JsonResponse({
+            'success': True,
+            'message': f'{accepted} posições registradas',
+            'accepted': accepted,
+            'rejected': rejected
+        })
+        
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Dados inválidos'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': f'Erro ao registrar localizações: {str(e)}'
+        }, status=500)
+
+@login_required
+def nearby_riders(request):
+    """Motoboys disponíveis mais próximos de um ponto (?lat=&lng=&k=&radius= em km)"""
+    # Motoboys também são staff; a posição dos colegas fica só com a administração
+    if not request.user.is_staff or hasattr(request.user, 'motoboy'):
+        return JsonResponse({'success': False, 'message': 'Acesso negado'}, status=403)
+    
+    try:
+        latitude = float(request.GET['lat'])
+        longitude = float(request.GET['lng'])
+        k = int(request.GET.get('k', 5))
+        radius_km = float(request.GET.get('radius', 5))
+    except (KeyError, ValueError):
+        latitude = None
+    if latitude is None or not (-90 <= latitude <= 90 and -180 <= longitude <= 180 and 1 <= k <= 100 and 0 < radius_km <= 50):
+        return JsonResponse({
+            'success': False,
+            'message': 'Informe lat e lng válidos, k entre 1 e 100 e radius (km) até 50'
+        }, status=400)
+    
+    riders = nearest_available_riders(latitude, longitude, k, radius_km)
+    details = {
+        motoboy_id: (full_name, vehicle_plate)
+        for motoboy_id, full_name, vehicle_plate in Motoboy.objects.filter(
+            id__in=[rider['motoboy_id'] for rider in riders]
+        ).values_list('id', 'full_name', 'vehicle_plate')
+    }
+    
+    return JsonResponse({
+        'success': True,
+        'riders': [
+            {
+                'id': str(rider['motoboy_id']),
+                'full_name': details.get(rider['motoboy_id'], ('', ''))[0],
+                'vehicle_plate': details.get(rider['motoboy_id'], ('', ''))[1],
+                'latitude': rider['latitude'],
+                'longitude': rider['longitude'],
+                'distance_km': rider['distance_km'],
+            }
+            for rider in riders
+        ]
+    })
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def update_motoboy_status(request):
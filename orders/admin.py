@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Order, MenuItem, CartItem
+from .models import Order, OrderItem, MenuItem, CartItem, GeocodedAddress, DeliveryZone, DispatchOffer
 
 @admin.register(MenuItem)
 class MenuItemAdmin(admin.ModelAdmin):
@@ -16,10 +16,39 @@ class CartItemAdmin(admin.ModelAdmin):
     search_fields = ['menu_item__name', 'session_key']
     readonly_fields = ['total_price']
 
+@admin.register(GeocodedAddress)
+class GeocodedAddressAdmin(admin.ModelAdmin):
+    list_display = ['address', 'city', 'latitude', 'longitude', 'created_at']
+    search_fields = ['address', 'city']
+    readonly_fields = ['address_hash', 'created_at']
+
+@admin.register(DeliveryZone)
+class DeliveryZoneAdmin(admin.ModelAdmin):
+    list_display = ['cep_prefix', 'city', 'distance_km', 'delivery_fee', 'updated_at']
+    search_fields = ['cep_prefix', 'city']
+    readonly_fields = ['pricing_signature', 'updated_at']
+
+@admin.register(DispatchOffer)
+class DispatchOfferAdmin(admin.ModelAdmin):
+    list_display = ['order', 'motoboy', 'status', 'distance_km', 'score', 'created_at', 'expires_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['order__order_number', 'motoboy__full_name']
+    raw_id_fields = ['order', 'motoboy']
+    readonly_fields = ['created_at', 'responded_at']
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    fields = ['product', 'product_name', 'unit_price', 'quantity', 'total_price']
+    readonly_fields = ['total_price']
+    raw_id_fields = ['product']
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     """Admin customizado para pedidos"""
     
+    inlines = [OrderItemInline]
+    
     list_display = ('order_number', 'customer', 'status', 'priority', 'motoboy', 'final_price', 'created_at')
     list_filter = ('status', 'priority', 'is_fragile', 'created_at', 'delivered_at')
     search_fields = ('order_number', 'customer__first_name', 'customer__last_name', 'customer__email', 'pickup_address', 'delivery_address')
@@ -1,6 +1,19 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def install_search_index(sender, using, **kwargs):
+    """Garante o índice de busca de pedidos depois de cada migrate"""
+    from django.db import connections
+    from .search import ensure_search_index
+    ensure_search_index(connections[using])
 
 
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'orders'
+
+    def ready(self):
+        # Registra os signals de invalidação da tabela de preços e do documento de busca
+        from . import signals  # noqa: F401
+        post_migrate.connect(install_search_index, sender=self)
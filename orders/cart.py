@@ -0,0 +1,397 @@
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum, Count, F, DecimalField
+from django.contrib.sessions.models import Session
+from django.http import Http404
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import MenuItem, CartItem
+from datetime import timedelta
+import time
+
+PRICE_TABLE_VERSION_KEY = 'menu_items:version'
+
+# Chave do carrinho dentro da sessão (SessionCart)
+CART_SESSION_KEY = 'cart'
+
+
+def _get_price_table_version():
+    """Versão atual da tabela de preços dos itens do cardápio"""
+    version = cache.get(PRICE_TABLE_VERSION_KEY)
+    if version is None:
+        cache.add(PRICE_TABLE_VERSION_KEY, int(time.time()), None)
+        version = cache.get(PRICE_TABLE_VERSION_KEY)
+    return version
+
+
+def invalidate_price_table():
+    """Invalida a tabela de preços em cache"""
+    try:
+        cache.incr(PRICE_TABLE_VERSION_KEY)
+    except ValueError:
+        cache.set(PRICE_TABLE_VERSION_KEY, int(time.time()), None)
+
+
+def get_price_table():
+    """Retorna {id: (nome, preço, disponível)} de todos os itens do cardápio, em cache"""
+    key = f'menu_items:{_get_price_table_version()}:prices'
+    table = cache.get(key)
+    if table is None:
+        table = {
+            pk: (name, price, is_available)
+            for pk, name, price, is_available in MenuItem.objects.values_list('id', 'name', 'price', 'is_available')
+        }
+        cache.set(key, table, settings.MENU_CACHE_TIMEOUT)
+    return table
+
+
+def clean_quantity(quantity, minimum=1):
+    """Quantidade do carrinho como int; ValueError se não for inteira ou for menor que ``minimum``"""
+    if isinstance(quantity, str):
+        quantity = quantity.strip()
+        if quantity.lstrip('-').isdigit():
+            quantity = int(quantity)
+    elif isinstance(quantity, float) and quantity.is_integer():
+        quantity = int(quantity)
+    if isinstance(quantity, bool) or not isinstance(quantity, int):
+        raise ValueError(f'Quantidade inválida: {quantity!r}')
+    if minimum is not None and quantity < minimum:
+        raise ValueError(f'Quantidade deve ser no mínimo {minimum}')
+    return quantity
+
+
+class BaseCart(ABC):
+    """Interface comum dos backends de carrinho.
+
+    add, update e apply validam as quantidades aqui, antes de o backend mexer em qualquer coisa,
+    para os backends responderem igual a quantidades inválidas.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        # Garante que a sessão existe
+        if not request.session.session_key:
+            request.session.create()
+        self.session_key = request.session.session_key
+
+    def add(self, menu_item_id, quantity=1):
+        """Adiciona um item (quantidade >= 1) e retorna o nome do item"""
+        return self._add(int(menu_item_id), clean_quantity(quantity))
+
+    def update(self, line_id, quantity):
+        """Altera a quantidade de uma linha (remove se quantidade <= 0)"""
+        self._update(int(line_id), clean_quantity(quantity, minimum=None))
+
+    @abstractmethod
+    def _add(self, menu_item_id, quantity):
+        """add com argumentos já validados"""
+
+    @abstractmethod
+    def _update(self, line_id, quantity):
+        """update com argumentos já validados"""
+
+    @abstractmethod
+    def remove(self, line_id):
+        """Remove uma linha e retorna o nome do item"""
+
+    @abstractmethod
+    def lines(self):
+        """Retorna as linhas do carrinho como dicionários"""
+
+    def summary(self):
+        """Retorna subtotal (Decimal), total de unidades e quantidade de linhas"""
+        lines = self.lines()
+        return {
+            'subtotal': sum((line['total_price'] for line in lines), Decimal('0')),
+            'item_count': sum(line['quantity'] for line in lines),
+            'line_count': len(lines),
+        }
+
+    def apply(self, operations):
+        """Aplica uma lista de operações add/update/remove de uma só vez.
+
+        Todas as operações são validadas antes de qualquer uma ser aplicada.
+        """
+        cleaned = []
+        for op in operations:
+            action = op.get('action')
+            if action not in ('add', 'update', 'remove'):
+                raise ValueError(f'Ação inválida: {action}')
+            try:
+                item_id = int(op['item_id'])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f'Item inválido: {op.get("item_id")!r}')
+            quantity = op.get('quantity', 1)
+            if action != 'remove':
+                quantity = clean_quantity(quantity, minimum=1 if action == 'add' else None)
+            cleaned.append({'action': action, 'item_id': item_id, 'quantity': quantity})
+        self._apply(cleaned)
+
+    @abstractmethod
+    def _apply(self, operations):
+        """apply com operações já validadas"""
+
+
+
+class DatabaseCart(BaseCart):
+    """Carrinho armazenado diretamente em CartItem"""
+
+    def _queryset(self):
+        return CartItem.objects.filter(session_key=self.session_key)
+
+    def _add(self, menu_item_id, quantity):
+        menu_item = MenuItem.objects.filter(id=menu_item_id, is_available=True).first()
+        if menu_item is None:
+            raise Http404('Item não encontrado')
+
+        cart_item, created = CartItem.objects.get_or_create(
+            session_key=self.session_key,
+            menu_item=menu_item,
+            defaults={'quantity': quantity}
+        )
+        if not created:
+            cart_item.quantity += quantity
+            cart_item.save(update_fields=['quantity'])
+        return menu_item.name
+
+    def _update(self, line_id, quantity):
+        cart_item = self._queryset().filter(id=line_id).first()
+        if cart_item is None:
+            raise Http404('Item não encontrado no carrinho')
+
+        if quantity <= 0:
+            cart_item.delete()
+        else:
+            cart_item.quantity = quantity
+            cart_item.save(update_fields=['quantity'])
+
+    def remove(self, line_id):
+        cart_item = self._queryset().filter(id=line_id).select_related('menu_item').first()
+        if cart_item is None:
+            raise Http404('Item não encontrado no carrinho')
+
+        cart_item.delete()
+        return cart_item.menu_item.name
+
+    def lines(self):
+        return [
+            {
+                'id': item.id,
+                'menu_item_id': item.menu_item_id,
+                'name': item.menu_item.name,
+                'price': item.menu_item.price,
+                'quantity': item.quantity,
+                'total_price': item.total_price,
+            }
+            for item in self._queryset().select_related('menu_item')
+        ]
+
+    def _apply(self, operations):
+        # Carrega o carrinho e os itens adicionados uma vez, aplica tudo em memória
+        # e grava com delete/bulk_update/bulk_create numa única transação
+        lines = {item.id: item for item in self._queryset()}
+        by_menu_item = {item.menu_item_id: item for item in lines.values()}
+
+        add_ids = {op['item_id'] for op in operations if op['action'] == 'add'}
+        available = set(
+            MenuItem.objects.filter(id__in=add_ids, is_available=True).values_list('id', flat=True)
+        ) if add_ids else set()
+
+        new_items = {}
+        changed = set()
+        removed = set()
+        for op in operations:
+            action, item_id, quantity = op['action'], op['item_id'], op['quantity']
+
+            if action == 'add':
+                if item_id not in available:
+                    raise Http404(f'Item {item_id} não encontrado')
+                cart_item = by_menu_item.get(item_id)
+                if cart_item is not None and cart_item.id not in removed:
+                    cart_item.quantity += quantity
+                    changed.add(cart_item.id)
+                elif item_id in new_items:
+                    new_items[item_id].quantity += quantity
+                else:
+                    new_items[item_id] = CartItem(session_key=self.session_key, menu_item_id=item_id, quantity=quantity)
+            else:
+                cart_item = lines.get(item_id)
+                if cart_item is None or item_id in removed:
+                    raise Http404(f'Linha {item_id} não encontrada no carrinho')
+                if action == 'remove' or quantity <= 0:
+                    removed.add(item_id)
+                    changed.discard(item_id)
+                else:
+                    cart_item.quantity = quantity
+                    changed.add(item_id)
+
+        with transaction.atomic():
+            if removed:
+                self._queryset().filter(id__in=removed).delete()
+            if changed:
+                CartItem.objects.bulk_update([lines[pk] for pk in changed], ['quantity'])
+            if new_items:
+                CartItem.objects.bulk_create(new_items.values())
+
+    def summary(self):
+        # Subtotal, unidades e linhas numa única consulta agregada, sem passar por float
+        totals = self._queryset().aggregate(
+            subtotal=Sum(
+                F('quantity') * F('menu_item__price'),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            ),
+            item_count=Sum('quantity'),
+            line_count=Count('id'),
+        )
+        return {
+            'subtotal': totals['subtotal'] or Decimal('0'),
+            'item_count': totals['item_count'] or 0,
+            'line_count': totals['line_count'],
+        }
+
+
+class SessionCart(BaseCart):
+    """Carrinho compacto {menu_item_id: quantidade} guardado na própria sessão.
+
+    Vive enquanto a sessão viver: não disputa espaço no cache com outros dados nem some
+    quando o worker reinicia. Na sessão (JSON) as chaves ficam como texto.
+    """
+
+    def _load(self):
+        stored = self.request.session.get(CART_SESSION_KEY, {})
+        return {int(item_id): quantity for item_id, quantity in stored.items()}
+
+    def _save(self, data):
+        if data:
+            self.request.session[CART_SESSION_KEY] = {str(item_id): quantity for item_id, quantity in data.items()}
+        else:
+            self.request.session.pop(CART_SESSION_KEY, None)
+
+    def _add(self, menu_item_id, quantity):
+        entry = get_price_table().get(menu_item_id)
+        if entry is None or not entry[2]:
+            raise Http404('Item não encontrado')
+
+        data = self._load()
+        data[menu_item_id] = data.get(menu_item_id, 0) + quantity
+        self._save(data)
+        return entry[0]
+
+    def _update(self, line_id, quantity):
+        data = self._load()
+        if line_id not in data:
+            raise Http404('Item não encontrado no carrinho')
+
+        if quantity <= 0:
+            del data[line_id]
+        else:
+            data[line_id] = quantity
+        self._save(data)
+
+    def remove(self, line_id):
+        data = self._load()
+        if int(line_id) not in data:
+            raise Http404('Item não encontrado no carrinho')
+
+        del data[int(line_id)]
+        self._save(data)
+        entry = get_price_table().get(int(line_id))
+        return entry[0] if entry else ''
+
+    def _apply(self, operations):
+        prices = get_price_table()
+        data = self._load()
+        for op in operations:
+            action, item_id, quantity = op['action'], op['item_id'], op['quantity']
+
+            if action == 'add':
+                entry = prices.get(item_id)
+                if entry is None or not entry[2]:
+                    raise Http404(f'Item {item_id} não encontrado')
+                data[item_id] = data.get(item_id, 0) + quantity
+            else:
+                if item_id not in data:
+                    raise Http404(f'Linha {item_id} não encontrada no carrinho')
+                if action == 'remove' or quantity <= 0:
+                    del data[item_id]
+                else:
+                    data[item_id] = quantity
+        self._save(data)
+
+    def lines(self):
+        prices = get_price_table()
+        lines = []
+        for menu_item_id, quantity in self._load().items():
+            entry = prices.get(menu_item_id)
+            if entry is None:
+                # Item removido do cardápio
+                continue
+            name, price, is_available = entry
+            lines.append({
+                # No cache a linha é identificada pelo próprio item do cardápio
+                'id': menu_item_id,
+                'menu_item_id': menu_item_id,
+                'name': name,
+                'price': price,
+                'quantity': quantity,
+                'total_price': price * quantity,
+            })
+        return lines
+
+
+def get_cart(request):
+    """Retorna o backend de carrinho configurado em settings.CART_BACKEND"""
+    return import_string(settings.CART_BACKEND)(request)
+
+
+def sweep_expired_carts(ttl_hours=None, batch_size=500):
+    """Remove, em lotes, itens de carrinho antigos ou de sessões que não existem mais"""
+    if ttl_hours is None:
+        ttl_hours = settings.CART_TTL_HOURS
+    now = timezone.now()
+    cutoff = now - timedelta(hours=ttl_hours)
+
+    removed = 0
+    last_id = 0
+    while True:
+        # Percorre a tabela por faixas de id para não travar a tabela inteira
+        batch = list(
+            CartItem.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', 'session_key', 'added_at')[:batch_size]
+        )
+        if not batch:
+            break
+        last_id = batch[-1][0]
+
+        alive = set(
+            Session.objects.filter(
+                session_key__in={session_key for _, session_key, _ in batch},
+                expire_date__gt=now
+            ).values_list('session_key', flat=True)
+        )
+        expired_ids = [
+            pk for pk, session_key, added_at in batch
+            if added_at < cutoff or session_key not in alive
+        ]
+        if expired_ids:
+            removed += CartItem.objects.filter(id__in=expired_ids).delete()[0]
+
+    return removed
+
+
+def sweep_expired_sessions(batch_size=500):
+    """Remove, em lotes, sessões expiradas de django_session"""
+    removed = 0
+    while True:
+        keys = list(
+            Session.objects.filter(expire_date__lte=timezone.now())
+            .values_list('session_key', flat=True)[:batch_size]
+        )
+        if not keys:
+            break
+        removed += Session.objects.filter(session_key__in=keys).delete()[0]
+    return removed
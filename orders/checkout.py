@@ -0,0 +1,83 @@
+from decimal import Decimal
+from django.db import transaction
+from core.models import Product
+from .delivery import DEFAULT_DELIVERY_FEE
+from .models import Order, OrderItem
+
+
+class CheckoutError(Exception):
+    """Carrinho inválido no checkout (mensagem exibida ao cliente)"""
+
+
+def build_order_lines(cart_data):
+    """Valida o carrinho contra o cardápio numa única consulta e monta as linhas do pedido"""
+    quantities = {}
+    names = {}
+    for item in cart_data:
+        try:
+            product_id = int(item['id'])
+            quantity = int(item.get('quantity', 1))
+        except (KeyError, TypeError, ValueError):
+            raise CheckoutError('Item do carrinho inválido')
+        if quantity <= 0:
+            raise CheckoutError('Quantidade inválida no carrinho')
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+        names[product_id] = item.get('name', str(product_id))
+
+    products = Product.objects.in_bulk(list(quantities))
+
+    unavailable = [
+        names[product_id] for product_id in quantities
+        if product_id not in products or not products[product_id].is_available
+    ]
+    if unavailable:
+        raise CheckoutError(f'Produtos indisponíveis: {", ".join(unavailable)}')
+
+    # Preço sempre vem do banco, nunca do que o navegador enviou
+    return [
+        OrderItem(
+            product=products[product_id],
+            product_name=products[product_id].name,
+            unit_price=products[product_id].price,
+            quantity=quantity,
+        )
+        for product_id, quantity in quantities.items()
+    ]
+
+
+def place_order(customer, data, cart_data, delivery_fee=DEFAULT_DELIVERY_FEE):
+    """Cria o pedido e suas linhas numa única transação, com número fixo de consultas.
+
+    ``customer`` é o CustomerRef de users.services.resolve_customer: o documento de busca
+    usa o nome e o e-mail dele, sem ler a tabela de usuários.
+    """
+    lines = build_order_lines(cart_data)
+
+    subtotal = sum((line.total_price for line in lines), Decimal('0'))
+    total = subtotal + Decimal(str(delivery_fee))
+
+    description = '\n'.join(
+        [f"Pedido com {len(lines)} itens"] +
+        [f"- {line.product_name} x{line.quantity} - R$ {line.unit_price}" for line in lines]
+    )
+
+    with transaction.atomic():
+        order = Order(
+            customer_id=customer.id,
+            pickup_address="Restaurante MotoDelivery",  # Endereço fixo
+            delivery_address=data['delivery_address'],
+            description=description,
+            weight=0.5,  # Peso padrão
+            dimensions='Padrão',
+            is_fragile=False,
+            priority='normal',
+            base_price=total,
+            distance_km=0  # Será calculado depois
+        )
+        order.search_customer = customer
+        order.save(force_insert=True)
+        for line in lines:
+            line.order = order
+        OrderItem.objects.bulk_create(lines)
+
+    return order
@@ -0,0 +1,52 @@
+import numpy as np
+
+# Coordenadas do restaurante (exemplo: Lisboa)
+RESTAURANT_COORDS = {
+    'lat': 38.7223,
+    'lng': -9.1393,
+    'address': 'Rua Augusta, 123, Baixa, Lisboa'
+}
+
+EARTH_RADIUS_KM = 6371  # Raio da Terra em km
+
+# Fator de correção para rotas reais (considera curvas, vias, etc.)
+# Fator típico: 1.3 a 1.5 (30-50% a mais que distância em linha reta)
+ROUTE_FACTOR = 1.4
+
+# Taxa base mínima e taxa por km (R$ 2,50 por km)
+BASE_FEE = 3.00
+RATE_PER_KM = 2.50
+
+# Taxa cobrada quando ainda não há endereço de entrega
+DEFAULT_DELIVERY_FEE = 5.00
+
+# Limite de pontos por requisição de cotação em lote
+MAX_BATCH_SIZE = 5000
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Distância em linha reta (Haversine) entre arrays de coordenadas, em km"""
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lng1, lat2, lng2))
+
+    dlat = lat2 - lat1
+    dlng = lng2 - lng1
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arcsin(np.sqrt(a))
+
+
+def route_distances(latitudes, longitudes, origin=RESTAURANT_COORDS):
+    """Distância de rota estimada do restaurante até cada ponto (NaN vira 0)"""
+    distances = haversine_km(origin['lat'], origin['lng'], latitudes, longitudes) * ROUTE_FACTOR
+    return np.round(np.nan_to_num(distances, nan=0.0), 2)
+
+
+def delivery_fees(distances):
+    """Taxa de entrega para cada distância, com os mesmos valores do cálculo unitário"""
+    return np.round(BASE_FEE + np.asarray(distances, dtype=np.float64) * RATE_PER_KM, 2)
+
+
+def quote_coordinates(latitudes, longitudes, origin=RESTAURANT_COORDS):
+    """Cotação vetorizada: retorna (distâncias, taxas) para arrays de coordenadas"""
+    distances = route_distances(latitudes, longitudes, origin)
+    return distances, delivery_fees(distances)
@@ -0,0 +1,213 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from motoboys.locations import LOCATION_MAX_AGE, get_buffered_locations
+from motoboys.models import Motoboy
+from motoboys.spatial import RiderGrid
+from .delivery import RESTAURANT_COORDS
+from .models import Order, DispatchOffer
+import numpy as np
+
+# Pesos da pontuação (menor é melhor), em "km equivalentes"
+RATING_WEIGHT_KM = 1.0    # cada ponto de avaliação abaixo de 5 pesa como 1 km a mais
+PRIORITY_WEIGHT_KM = 2.0  # cada nível de prioridade do pedido desconta 2 km
+
+# Status de pedido que ocupam o motoboy
+ACTIVE_ORDER_STATUSES = ['accepted', 'picked_up', 'in_transit']
+
+
+def score(distance_km, priority_rank, rating):
+    """Pontuação de uma oferta: distância até a retirada, prioridade do pedido e avaliação do motoboy"""
+    return distance_km + RATING_WEIGHT_KM * (5 - rating) - PRIORITY_WEIGHT_KM * priority_rank
+
+
+def match_orders(orders, riders, max_radius_km, excluded=None):
+    """Casa pedidos com motoboys livres, sem tocar no banco.
+
+    ``orders``: sequência de (order_id, lat, lng, priority_rank) já na ordem da fila.
+    ``riders``: sequência de (motoboy_id, lat, lng, rating).
+    ``excluded``: {order_id: {motoboy_id, ...}} que já recusaram ou deixaram expirar.
+
+    Os pedidos escolhem na ordem da fila (urgentes primeiro); cada um fica com o motoboy
+    livre de menor pontuação dentro do raio, buscado na grade espacial. Pedidos com o
+    mesmo ponto de retirada reaproveitam a mesma busca. Retorna [(order_id, motoboy_id,
+    distance_km, score)].
+    """
+    if not len(orders) or not len(riders):
+        return []
+
+    rider_ids = [rider[0] for rider in riders]
+    ratings = np.array([float(rider[3]) for rider in riders], dtype=np.float64)
+    grid = RiderGrid(
+        rider_ids,
+        [float(rider[1]) for rider in riders],
+        [float(rider[2]) for rider in riders],
+        cell_km=max_radius_km,
+    )
+    rider_index = {rider_id: index for index, rider_id in enumerate(rider_ids)}
+    excluded = excluded or {}
+
+    free = np.ones(len(rider_ids), dtype=bool)
+    remaining = len(rider_ids)
+    nearby = {}
+    matches = []
+
+    for order_id, latitude, longitude, priority_rank in orders:
+        point = (float(latitude), float(longitude))
+        if point not in nearby:
+            indexes, distances = grid.within(point[0], point[1], max_radius_km)
+            nearby[point] = (indexes, distances, score(distances, 0, ratings[indexes]))
+        indexes, distances, base_scores = nearby[point]
+
+        available = free[indexes]
+        if order_id in excluded:
+            available &= ~np.isin(indexes, [rider_index[r] for r in excluded[order_id] if r in rider_index])
+        if not available.any():
+            continue
+
+        candidates = np.flatnonzero(available)
+        best = candidates[np.argmin(base_scores[candidates])]
+        chosen = indexes[best]
+
+        free[chosen] = False
+        remaining -= 1
+        matches.append((
+            order_id,
+            rider_ids[chosen],
+            round(float(distances[best]), 2),
+            float(base_scores[best]) - PRIORITY_WEIGHT_KM * priority_rank,
+        ))
+        if not remaining:
+            break
+
+    return matches
+
+
+def run_dispatch(now=None, batch_size=None):
+    """Uma rodada do despacho: expira ofertas vencidas e oferece pedidos da fila.
+
+    Número fixo de consultas por rodada, independente de quantos pedidos e motoboys.
+    Retorna {'expired', 'offered', 'orders', 'riders'}.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or getattr(settings, 'DISPATCH_BATCH_SIZE', 2000)
+    timeout = timedelta(seconds=getattr(settings, 'DISPATCH_OFFER_TIMEOUT_SECONDS', 30))
+    max_radius_km = getattr(settings, 'DISPATCH_MAX_RADIUS_KM', 10.0)
+
+    expired = DispatchOffer.objects.filter(status='offered', expires_at__lte=now).update(
+        status='expired', responded_at=now
+    )
+
+    open_offers = DispatchOffer.objects.filter(status='offered')
+
+    orders = list(
+        Order.dispatch_queue()
+        .exclude(id__in=open_offers.values('order_id'))
+        .values_list('id', 'pickup_latitude', 'pickup_longitude', 'priority_rank')[:batch_size]
+    )
+    # Sem coordenadas de retirada o pedido sai do restaurante
+    orders = [
+        (
+            order_id,
+            latitude if latitude is not None else RESTAURANT_COORDS['lat'],
+            longitude if longitude is not None else RESTAURANT_COORDS['lng'],
+            priority_rank,
+        )
+        for order_id, latitude, longitude, priority_rank in orders
+    ]
+
+    riders = list(
+        Motoboy.objects.filter(
+            status='available',
+            is_active=True,
+            current_latitude__isnull=False,
+            current_longitude__isnull=False,
+            last_location_update__gte=now - LOCATION_MAX_AGE,
+        )
+        .exclude(id__in=open_offers.values('motoboy_id'))
+        # Quem já está com um pedido em andamento não recebe outro
+        .exclude(id__in=Order.objects.filter(
+            status__in=ACTIVE_ORDER_STATUSES, motoboy__isnull=False
+        ).values('motoboy_id'))
+        .values_list('id', 'current_latitude', 'current_longitude', 'rating')
+    )
+
+    # Posições do buffer de pings são mais novas que as gravadas no banco. Só existem
+    # no processo do worker web; rodando em dispatch_orders vale a posição do banco
+    buffered = get_buffered_locations([rider[0] for rider in riders])
+    for index, (motoboy_id, _, _, rating) in enumerate(riders):
+        if motoboy_id in buffered:
+            latitude, longitude, _ = buffered[motoboy_id]
+            riders[index] = (motoboy_id, latitude, longitude, rating)
+
+    excluded = {}
+    if orders and riders:
+        refused = DispatchOffer.objects.filter(
+            order_id__in=[order[0] for order in orders],
+            status__in=['declined', 'expired'],
+        ).values_list('order_id', 'motoboy_id')
+        for order_id, motoboy_id in refused:
+            excluded.setdefault(order_id, set()).add(motoboy_id)
+
+    matches = match_orders(orders, riders, max_radius_km, excluded)
+
+    # ignore_conflicts: se outra rodada criou uma oferta em aberto para o mesmo pedido
+    # ou motoboy, a restrição única descarta esta
+    expires_at = now + timeout
+    DispatchOffer.objects.bulk_create([
+        DispatchOffer(
+            order_id=order_id,
+            motoboy_id=motoboy_id,
+            distance_km=distance_km,
+            score=offer_score,
+            expires_at=expires_at,
+        )
+        for order_id, motoboy_id, distance_km, offer_score in matches
+    ], ignore_conflicts=True)
+
+    # O bulk_create não diz quantas linhas o ON CONFLICT descartou: conta as gravadas
+    offered = 0
+    if matches:
+        offered = DispatchOffer.objects.filter(
+            order_id__in=[match[0] for match in matches], expires_at=expires_at
+        ).count()
+
+    return {'expired': expired, 'offered': offered, 'orders': len(orders), 'riders': len(riders)}
+
+
+def respond_to_offer(offer_id, motoboy, accept, now=None):
+    """Resposta do motoboy a uma oferta em aberto.
+
+    Retorna o status final da oferta ('accepted', 'declined' ou 'expired'), ou None se
+    a oferta não existe, não é dele ou já foi respondida. Aceitar usa o mesmo UPDATE
+    condicional de Order.accept_pending: se o pedido foi pego por outro caminho, a
+    oferta expira.
+    """
+    now = now or timezone.now()
+    order_id = DispatchOffer.objects.filter(id=offer_id, motoboy=motoboy).values_list('order_id', flat=True).first()
+    if order_id is None:
+        return None
+
+    with transaction.atomic():
+        claimed = DispatchOffer.objects.filter(
+            id=offer_id, status='offered', expires_at__gt=now
+        ).update(status='accepted' if accept else 'declined', responded_at=now)
+        if not claimed:
+            return None
+        if not accept:
+            return 'declined'
+        if Order.accept_pending(order_id, motoboy):
+            return 'accepted'
+        DispatchOffer.objects.filter(id=offer_id).update(status='expired')
+        return 'expired'
+
+
+def get_open_offer(motoboy, now=None):
+    """Oferta em aberto (não vencida) do motoboy, com o pedido carregado, ou None"""
+    now = now or timezone.now()
+    return (
+        DispatchOffer.objects.select_related('order')
+        .filter(motoboy=motoboy, status='offered', expires_at__gt=now)
+        .first()
+    )
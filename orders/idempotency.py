@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from functools import wraps
+import hashlib
+import re
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+# Chaves aceitas: UUIDs e tokens parecidos gerados pelo navegador
+_KEY_REGEX = re.compile(r'^[A-Za-z0-9_\-]{8,128}$')
+
+# Marca gravada enquanto a primeira requisição com a chave ainda está em andamento
+_IN_PROGRESS = 'in-progress'
+
+
+def _cache_key(request, key):
+    """Chave de cache da requisição (a sessão não entra: o visitante pode ganhar uma no checkout)"""
+    return f'idempotency:{request.path}:{key}'
+
+
+def _fingerprint(request):
+    """Hash do corpo da requisição (detecta chave reutilizada com outro pedido)"""
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def idempotent(view):
+    """Repete a resposta gravada quando a mesma chave Idempotency-Key chega de novo.
+
+    Só vale para POST com o cabeçalho; sem ele a view roda normalmente. A primeira
+    requisição reserva a chave com cache.add (atômico), então um duplo clique que chega
+    enquanto o pedido ainda está sendo criado recebe 409 em vez de criar outro pedido.
+    Só respostas de sucesso são gravadas; erros liberam a chave para o cliente corrigir
+    os dados ou tentar de novo.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER)
+        if request.method != 'POST' or not key:
+            return view(request, *args, **kwargs)
+
+        if not _KEY_REGEX.match(key):
+            return JsonResponse({
+                'success': False,
+                'message': 'Idempotency-Key inválida'
+            }, status=400)
+
+        timeout = getattr(settings, 'IDEMPOTENCY_TTL_SECONDS', 24 * 60 * 60)
+        cache_key = _cache_key(request, key)
+        fingerprint = _fingerprint(request)
+
+        if not cache.add(cache_key, {'state': _IN_PROGRESS, 'fingerprint': fingerprint}, timeout):
+            stored = cache.get(cache_key)
+            if stored is not None:
+                if stored['fingerprint'] != fingerprint:
+                    return JsonResponse({
+                        'success': False,
+                        'message': 'Idempotency-Key já usada com outros dados'
+                    }, status=422)
+                if stored['state'] == _IN_PROGRESS:
+                    return JsonResponse({
+                        'success': False,
+                        'message': 'Pedido já está sendo processado'
+                    }, status=409)
+                response = HttpResponse(stored['body'], status=stored['status'], content_type=stored['content_type'])
+                response['Idempotent-Replayed'] = 'true'
+                return response
+            # A chave expirou entre o add e o get: processa normalmente
+            cache.add(cache_key, {'state': _IN_PROGRESS, 'fingerprint': fingerprint}, timeout)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+
+        if response.status_code >= 400 or response.streaming:
+            cache.delete(cache_key)
+        else:
+            cache.set(cache_key, {
+                'state': 'done',
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'content_type': response['Content-Type'],
+                'body': response.content,
+            }, timeout)
+        return response
+
+    return wrapper
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from orders.models import Order
+from orders.numbering import RandomOrderNumberAllocator, BlockOrderNumberAllocator, set_order_number_allocator
+from users.models import User
+import time
+import uuid
+
+
+class Command(BaseCommand):
+    help = 'Compara a vazão de inserção de pedidos entre os geradores de número (num banco de teste descartado no final)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=2000, help='Pedidos inseridos por gerador')
+        parser.add_argument('--block-size', type=int, default=50, help='Tamanho do bloco do gerador sequencial')
+
+    def _run(self, allocator, count):
+        """Insere ``count`` pedidos (um commit por pedido, como no checkout) e retorna pedidos/segundo"""
+        email = f'bench-{uuid.uuid4().hex[:12]}@motodelivery.com'
+        customer = User.objects.create(username=email, email=email)
+        previous = set_order_number_allocator(allocator)
+        try:
+            start = time.perf_counter()
+            for _ in range(count):
+                Order.objects.create(
+                    customer=customer,
+                    pickup_address='Restaurante MotoDelivery',
+                    delivery_address='Rua Augusta, 1000 Lisboa',
+                    description='Benchmark',
+                    base_price=10,
+                )
+            elapsed = time.perf_counter() - start
+        finally:
+            set_order_number_allocator(previous)
+        return count / elapsed
+
+    def handle(self, *args, **options):
+        count = options['orders']
+        # Banco de teste próprio: os pedidos, os sinais que eles disparam e a sequência
+        # de números não tocam o banco real (um commit por pedido não cabe num rollback)
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = [
+                ('aleatório (antes)', self._run(RandomOrderNumberAllocator(), count)),
+                ('blocos (depois)', self._run(BlockOrderNumberAllocator(options['block_size']), count)),
+            ]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        for name, rate in results:
+            self.stdout.write(f'{name:<20} {rate:>10.0f} pedidos/s')
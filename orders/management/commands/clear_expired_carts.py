@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from orders.cart import sweep_expired_carts, sweep_expired_sessions
+import time
+
+
+class Command(BaseCommand):
+    help = 'Remove carrinhos abandonados e sessões expiradas em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl-hours', type=int, default=None,
+                            help='Idade máxima dos itens de carrinho (padrão: settings.CART_TTL_HOURS)')
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Quantidade de linhas apagadas por lote')
+        parser.add_argument('--keep-sessions', action='store_true',
+                            help='Não remove sessões expiradas de django_session')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Se informado, repete a limpeza a cada N segundos (modo sweeper)')
+
+    def handle(self, *args, **options):
+        while True:
+            carts = sweep_expired_carts(options['ttl_hours'], options['batch_size'])
+            sessions = 0
+            if not options['keep_sessions']:
+                sessions = sweep_expired_sessions(options['batch_size'])
+
+            self.stdout.write(self.style.SUCCESS(
+                f'{carts} item(ns) de carrinho e {sessions} sessão(ões) removido(s)'
+            ))
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
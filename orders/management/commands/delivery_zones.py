@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from orders.models import DeliveryZone
+from orders.zones import rebuild_zones, pricing_signature
+
+
+class Command(BaseCommand):
+    help = 'Mostra (e opcionalmente recalcula) a tabela de zonas de entrega por prefixo de CEP'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='Recalcula a tabela mesmo que as constantes de preço não tenham mudado')
+
+    def handle(self, *args, **options):
+        signature = pricing_signature()
+        zones = list(DeliveryZone.objects.all())
+        stale = not zones or any(zone.pricing_signature != signature for zone in zones)
+
+        if options['rebuild'] or stale:
+            zones = rebuild_zones()
+            self.stdout.write(self.style.SUCCESS(f'{len(zones)} zona(s) recalculada(s)'))
+
+        self.stdout.write(f'Assinatura de preços: {signature[:12]}')
+        self.stdout.write(f"{'CEP':<8}{'Cidade':<18}{'Distância (km)':>16}{'Taxa (R$)':>12}")
+        for zone in zones:
+            self.stdout.write(f'{zone.cep_prefix:<8}{zone.city:<18}{zone.distance_km:>16}{zone.delivery_fee:>12}')
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from orders.dispatch import run_dispatch
+import time
+
+
+class Command(BaseCommand):
+    help = 'Despacho automático: expira ofertas vencidas e oferece pedidos pendentes aos motoboys mais próximos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Pedidos da fila considerados por rodada (padrão: settings.DISPATCH_BATCH_SIZE)')
+        parser.add_argument('--interval', type=int, default=0,
+                            help='Se informado, repete o despacho a cada N segundos')
+
+    def handle(self, *args, **options):
+        while True:
+            result = run_dispatch(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"{result['offered']} oferta(s) criada(s), {result['expired']} expirada(s) "
+                f"({result['orders']} pedido(s) na fila, {result['riders']} motoboy(s) livre(s))"
+            ))
+
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from orders.models import Order
+from orders.search import build_search_document, ensure_search_index
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o documento de busca dos pedidos e reconstrói o índice FTS5/trigramas'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Pedidos gravados por lote')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        batch = []
+        updated = 0
+
+        for order in Order.objects.select_related('customer').iterator(chunk_size=batch_size):
+            document = build_search_document(
+                order.order_number, order.customer, order.pickup_address, order.delivery_address
+            )
+            if document != order.search_document:
+                order.search_document = document
+                batch.append(order)
+            if len(batch) >= batch_size:
+                Order.objects.bulk_update(batch, ['search_document'])
+                updated += len(batch)
+                batch = []
+        if batch:
+            Order.objects.bulk_update(batch, ['search_document'])
+            updated += len(batch)
+
+        ensure_search_index(connection)
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute("INSERT INTO orders_order_fts(orders_order_fts) VALUES ('rebuild')")
+
+        self.stdout.write(self.style.SUCCESS(f'{updated} pedido(s) atualizados; índice de busca reconstruído'))
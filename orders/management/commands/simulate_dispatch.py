@@ -0,0 +1,89 @@
+from django.core.management.base import BaseCommand
+from orders.delivery import RESTAURANT_COORDS
+from orders.dispatch import match_orders
+import numpy as np
+import time
+
+
+class Command(BaseCommand):
+    help = 'Simula o despacho automático em memória (sem banco) e mede atribuições por segundo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--riders', type=int, default=1000, help='Motoboys livres')
+        parser.add_argument('--orders', type=int, default=10000, help='Pedidos pendentes')
+        parser.add_argument('--radius', type=float, default=10.0, help='Raio máximo até a retirada (km)')
+        parser.add_argument('--spread-km', type=float, default=8.0,
+                            help='Desvio padrão da posição de motoboys e retiradas em torno do restaurante')
+        parser.add_argument('--single-pickup', action='store_true',
+                            help='Todos os pedidos saem do restaurante (caso real de hoje)')
+        parser.add_argument('--accept-rate', type=float, default=0.8,
+                            help='Chance de o motoboy aceitar a oferta; o resto recusa ou deixa expirar')
+        parser.add_argument('--busy-rounds', type=int, default=5,
+                            help='Rodadas que um motoboy fica em entrega depois de aceitar')
+        parser.add_argument('--max-rounds', type=int, default=200, help='Limite de rodadas da simulação')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options['seed'])
+        degrees = options['spread_km'] / 111.32
+
+        def around_restaurant(count):
+            return (
+                RESTAURANT_COORDS['lat'] + rng.normal(0, degrees, count),
+                RESTAURANT_COORDS['lng'] + rng.normal(0, degrees, count),
+            )
+
+        rider_lats, rider_lngs = around_restaurant(options['riders'])
+        ratings = np.clip(rng.normal(4.6, 0.3, options['riders']), 1, 5)
+        riders = list(zip(range(options['riders']), rider_lats, rider_lngs, ratings))
+
+        if options['single_pickup']:
+            order_lats = np.full(options['orders'], RESTAURANT_COORDS['lat'])
+            order_lngs = np.full(options['orders'], RESTAURANT_COORDS['lng'])
+        else:
+            order_lats, order_lngs = around_restaurant(options['orders'])
+        ranks = rng.choice([0, 1, 2, 3], size=options['orders'], p=[0.2, 0.6, 0.15, 0.05])
+        # Fila na ordem de despacho: maior prioridade primeiro, depois por chegada
+        queue = sorted(
+            zip(range(options['orders']), order_lats, order_lngs, ranks.tolist()),
+            key=lambda order: -order[3],
+        )
+
+        # Benchmark: uma rodada com a frota e a fila completas
+        start = time.perf_counter()
+        matches = match_orders(queue, riders, options['radius'])
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"Rodada única: {len(matches)} atribuições em {elapsed * 1000:.1f} ms "
+            f"({len(matches) / elapsed:,.0f} atribuições/s) com {len(riders)} motoboys e {len(queue)} pedidos"
+        )
+
+        # Simulação: ofertas aceitas ou recusadas/expiradas, motoboys voltando após a entrega
+        pending = list(queue)
+        busy_until = {}
+        excluded = {}
+        assigned = 0
+        total_time = 0.0
+        rounds = 0
+        while pending and rounds < options['max_rounds']:
+            rounds += 1
+            free_riders = [rider for rider in riders if busy_until.get(rider[0], 0) < rounds]
+            start = time.perf_counter()
+            matches = match_orders(pending, free_riders, options['radius'], excluded)
+            total_time += time.perf_counter() - start
+
+            accepted = set()
+            for order_id, rider_id, distance_km, score in matches:
+                if rng.random() < options['accept_rate']:
+                    accepted.add(order_id)
+                    busy_until[rider_id] = rounds + options['busy_rounds']
+                else:
+                    excluded.setdefault(order_id, set()).add(rider_id)
+            assigned += len(accepted)
+            pending = [order for order in pending if order[0] not in accepted]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Simulação: {assigned} de {len(queue)} pedidos atribuídos em {rounds} rodadas; "
+            f"tempo de casamento {total_time * 1000:.0f} ms no total, "
+            f"{total_time / max(rounds, 1) * 1000:.1f} ms por rodada"
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0005_geocodedaddress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryZone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cep_prefix', models.CharField(max_length=10, unique=True, verbose_name='Prefixo do CEP')),
+                ('city', models.CharField(blank=True, max_length=100, verbose_name='Cidade')),
+                ('latitude', models.DecimalField(decimal_places=6, max_digits=9, verbose_name='Latitude')),
+                ('longitude', models.DecimalField(decimal_places=6, max_digits=9, verbose_name='Longitude')),
+                ('distance_km', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Distância (km)')),
+                ('delivery_fee', models.DecimalField(decimal_places=2, max_digits=8, verbose_name='Taxa de entrega')),
+                ('pricing_signature', models.CharField(max_length=64, verbose_name='Assinatura da tabela de preços')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Zona de Entrega',
+                'verbose_name_plural': 'Zonas de Entrega',
+                'ordering': ['cep_prefix'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_category_product'),
+        ('orders', '0006_deliveryzone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_name', models.CharField(max_length=200, verbose_name='Nome do produto')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10, verbose_name='Preço unitário')),
+                ('quantity', models.PositiveIntegerField(default=1, verbose_name='Quantidade')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='orders.order', verbose_name='Pedido')),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='core.product', verbose_name='Produto')),
+            ],
+            options={
+                'verbose_name': 'Item do Pedido',
+                'verbose_name_plural': 'Itens do Pedido',
+                'ordering': ['id'],
+            },
+        ),
+    ]
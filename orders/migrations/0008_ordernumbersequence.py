@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_orderitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True, verbose_name='Dia')),
+                ('next_value', models.PositiveBigIntegerField(default=1, verbose_name='Próximo valor livre')),
+            ],
+            options={
+                'verbose_name': 'Sequência de Números de Pedido',
+                'verbose_name_plural': 'Sequências de Números de Pedido',
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+# Nomes e formato do documento usados por orders.search na época desta migration
+# (copiados: esta migration não deve mudar com o app)
+FTS_TABLE = 'orders_order_fts'
+FTS_TRIGGERS = ['orders_order_fts_ai', 'orders_order_fts_ad', 'orders_order_fts_au']
+TRIGRAM_INDEX = 'orders_order_search_trgm'
+
+
+def build_search_document(order_number, customer, pickup_address, delivery_address):
+    """Texto único com tudo que a busca da equipe consulta (pedido + cliente)"""
+    parts = [
+        order_number,
+        customer.first_name if customer else '',
+        customer.last_name if customer else '',
+        customer.email if customer else '',
+        pickup_address,
+        delivery_address,
+    ]
+    return ' '.join(part for part in parts if part)
+
+
+def fill_search_documents(apps, schema_editor):
+    """Preenche o documento de busca dos pedidos existentes"""
+    Order = apps.get_model('orders', 'Order')
+    batch = []
+    for order in Order.objects.select_related('customer').iterator(chunk_size=500):
+        order.search_document = build_search_document(
+            order.order_number, order.customer, order.pickup_address, order.delivery_address
+        )
+        batch.append(order)
+        if len(batch) >= 500:
+            Order.objects.bulk_update(batch, ['search_document'])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ['search_document'])
+
+
+def drop_search_index(apps, schema_editor):
+    """Remove a tabela FTS5/índice de trigramas antes de apagar a coluna"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for name in FTS_TRIGGERS:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0009_order_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Documento de busca'),
+        ),
+        # O índice FTS5/trigramas é criado pelo post_migrate (orders.apps.install_search_index)
+        migrations.RunPython(fill_search_documents, drop_search_index),
+    ]
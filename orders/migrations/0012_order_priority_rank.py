@@ -0,0 +1,45 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+PRIORITY_RANKS = {
+    'low': 0,
+    'normal': 1,
+    'high': 2,
+    'urgent': 3,
+}
+
+
+def fill_priority_rank(apps, schema_editor):
+    """Preenche o peso da prioridade dos pedidos existentes (um UPDATE por prioridade)"""
+    Order = apps.get_model('orders', 'Order')
+    for priority, rank in PRIORITY_RANKS.items():
+        Order.objects.filter(priority=priority).update(priority_rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motoboys', '0003_motoboy_device_ids'),
+        ('orders', '0011_order_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_pending_queue_idx',
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, verbose_name='Peso da prioridade'),
+        ),
+        migrations.RunPython(fill_priority_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('motoboy__isnull', True)), fields=['status', 'motoboy', '-priority_rank', 'created_at', 'id'], name='order_dispatch_queue_idx'),
+        ),
+    ]
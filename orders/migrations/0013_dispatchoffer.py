@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('motoboys', '0003_motoboy_device_ids'),
+        ('orders', '0012_order_priority_rank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DispatchOffer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('offered', 'Oferecida'), ('accepted', 'Aceita'), ('declined', 'Recusada'), ('expired', 'Expirada')], default='offered', max_length=10, verbose_name='Status')),
+                ('distance_km', models.DecimalField(decimal_places=2, max_digits=6, verbose_name='Distância até a retirada (km)')),
+                ('score', models.FloatField(verbose_name='Pontuação')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Data da oferta')),
+                ('expires_at', models.DateTimeField(verbose_name='Expira em')),
+                ('responded_at', models.DateTimeField(blank=True, null=True, verbose_name='Data da resposta')),
+                ('motoboy', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispatch_offers', to='motoboys.motoboy', verbose_name='Motoboy')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dispatch_offers', to='orders.order', verbose_name='Pedido')),
+            ],
+            options={
+                'verbose_name': 'Oferta de Despacho',
+                'verbose_name_plural': 'Ofertas de Despacho',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('status', 'offered')), fields=['expires_at'], name='dispatch_offer_expiry_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'offered')), fields=('order',), name='dispatch_offer_open_order'), models.UniqueConstraint(condition=models.Q(('status', 'offered')), fields=('motoboy',), name='dispatch_offer_open_motoboy')],
+            },
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.5 on 2026-10-18 13:20
+
+from django.db import migrations, models
+import orders.models
+import secrets
+
+# Nomes usados pela tabela FTS5 de orders.search (copiados: esta migration não deve mudar com o app)
+FTS_TABLE = 'orders_order_fts'
+FTS_TRIGGERS = ['orders_order_fts_ai', 'orders_order_fts_ad', 'orders_order_fts_au']
+
+
+def drop_fts(apps, schema_editor):
+    """Remove a tabela FTS5 ligada ao rowid implícito; o post_migrate recria ligada a search_key"""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for name in FTS_TRIGGERS:
+        schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+def fill_search_keys(apps, schema_editor):
+    """Dá uma chave de busca a cada pedido existente"""
+    Order = apps.get_model('orders', 'Order')
+    batch = []
+    for order in Order.objects.only('id').iterator(chunk_size=500):
+        order.search_key = secrets.randbits(62) + 1
+        batch.append(order)
+        if len(batch) >= 500:
+            Order.objects.bulk_update(batch, ['search_key'])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ['search_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0013_dispatchoffer'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_fts, drop_fts),
+        migrations.AddField(
+            model_name='order',
+            name='search_key',
+            field=models.BigIntegerField(editable=False, null=True, verbose_name='Chave de busca'),
+        ),
+        migrations.RunPython(fill_search_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='search_key',
+            field=models.BigIntegerField(default=orders.models.new_search_key, editable=False, unique=True, verbose_name='Chave de busca'),
+        ),
+    ]
@@ -2,8 +2,15 @@ from django.db import models
 from django.conf import settings
 from motoboys.models import Motoboy
 from django.core.validators import MinValueValidator, MaxValueValidator
+import secrets
 import uuid
 
+
+def new_search_key():
+    """Chave inteira do pedido no índice FTS5: aleatória, gravada na linha e nunca alterada"""
+    return secrets.randbits(62) + 1
+
+
 class MenuItem(models.Model):
     """Modelo para itens do cardápio"""
     name = models.CharField(max_length=100, verbose_name="Nome")
@@ -42,6 +49,57 @@ class CartItem(models.Model):
     def total_price(self):
         return self.menu_item.price * self.quantity
 
+class GeocodedAddress(models.Model):
+    """Endereços já resolvidos para coordenadas (cache persistente de geocodificação)"""
+    address_hash = models.CharField(max_length=64, unique=True, verbose_name="Hash do endereço")
+    address = models.TextField(verbose_name="Endereço normalizado")
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, verbose_name="Latitude")
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, verbose_name="Longitude")
+    city = models.CharField(max_length=100, blank=True, verbose_name="Cidade")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Endereço Geocodificado"
+        verbose_name_plural = "Endereços Geocodificados"
+
+    def __str__(self):
+        return f"{self.address} ({self.latitude}, {self.longitude})"
+
+    def as_coordinates(self):
+        """Retorna no mesmo formato da tabela de CEPs"""
+        return {'lat': float(self.latitude), 'lng': float(self.longitude), 'city': self.city}
+
+class DeliveryZone(models.Model):
+    """Tabela pré-calculada de distância e taxa de entrega por prefixo de CEP"""
+    cep_prefix = models.CharField(max_length=10, unique=True, verbose_name="Prefixo do CEP")
+    city = models.CharField(max_length=100, blank=True, verbose_name="Cidade")
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, verbose_name="Latitude")
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, verbose_name="Longitude")
+    distance_km = models.DecimalField(max_digits=8, decimal_places=2, verbose_name="Distância (km)")
+    delivery_fee = models.DecimalField(max_digits=8, decimal_places=2, verbose_name="Taxa de entrega")
+    pricing_signature = models.CharField(max_length=64, verbose_name="Assinatura da tabela de preços")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Zona de Entrega"
+        verbose_name_plural = "Zonas de Entrega"
+        ordering = ['cep_prefix']
+
+    def __str__(self):
+        return f"{self.cep_prefix} - {self.city} (R$ {self.delivery_fee})"
+
+class OrderNumberSequence(models.Model):
+    """Sequência diária de números de pedido, reservada em blocos por processo"""
+    day = models.DateField(unique=True, verbose_name="Dia")
+    next_value = models.PositiveBigIntegerField(default=1, verbose_name="Próximo valor livre")
+
+    class Meta:
+        verbose_name = "Sequência de Números de Pedido"
+        verbose_name_plural = "Sequências de Números de Pedido"
+
+    def __str__(self):
+        return f"{self.day}: {self.next_value}"
+
 class Order(models.Model):
     """Modelo para pedidos de entrega"""
     
@@ -62,6 +120,14 @@ class Order(models.Model):
         ('urgent', 'Urgente'),
     ]
     
+    # Peso de cada prioridade na fila (CharField ordenado dá ordem alfabética)
+    PRIORITY_RANKS = {
+        'low': 0,
+        'normal': 1,
+        'high': 2,
+        'urgent': 3,
+    }
+    
     # Identificação
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     order_number = models.CharField(max_length=20, unique=True, verbose_name="Número do pedido")
@@ -90,6 +156,8 @@ class Order(models.Model):
     # Status e prioridade
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Status")
     priority = models.CharField(max_length=10, choices=PRIORITY_CHOICES, default='normal', verbose_name="Prioridade")
+    # Ordem numérica da prioridade para a fila de despacho (derivada de priority no save)
+    priority_rank = models.PositiveSmallIntegerField(default=1, editable=False, verbose_name="Peso da prioridade")
     
     # Valores
     base_price = models.DecimalField(max_digits=8, decimal_places=2, verbose_name="Preço base")
@@ -114,10 +182,33 @@ class Order(models.Model):
     estimated_delivery_time = models.PositiveIntegerField(null=True, blank=True, verbose_name="Tempo estimado de entrega (minutos)")
     actual_delivery_time = models.PositiveIntegerField(null=True, blank=True, verbose_name="Tempo real de entrega (minutos)")
     
+    # Busca: número, cliente e endereços num só campo (indexado por FTS5/trigramas)
+    search_document = models.TextField(blank=True, default='', editable=False, verbose_name="Documento de busca")
+    # rowid da tabela FTS5 (o rowid implícito de orders_order pode mudar num VACUUM)
+    search_key = models.BigIntegerField(unique=True, default=new_search_key, editable=False, verbose_name="Chave de busca")
+    
     class Meta:
         verbose_name = "Pedido"
         verbose_name_plural = "Pedidos"
         ordering = ['-created_at']
+        indexes = [
+            # Paginação por cursor da lista de pedidos e estatísticas por intervalo de data
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            # Fila de despacho (dispatch_queue): só pedidos sem motoboy, já na ordem da fila.
+            # motoboy e id entram nas colunas para o top-N de ids sair só do índice
+            models.Index(
+                fields=['status', 'motoboy', '-priority_rank', 'created_at', 'id'],
+                condition=models.Q(motoboy__isnull=True),
+                name='order_dispatch_queue_idx',
+            ),
+            # Pedidos do motoboy (my_orders, histórico, estatísticas mensais)
+            models.Index(fields=['motoboy', '-created_at'], name='order_motoboy_created_idx'),
+            # Pedidos do cliente (user_dashboard, user_orders)
+            models.Index(fields=['customer', '-created_at'], name='order_customer_created_idx'),
+        ]
+    
+    # Campos que compõem o search_document
+    SEARCH_FIELDS = {'order_number', 'customer', 'customer_id', 'pickup_address', 'delivery_address'}
     
     def __str__(self):
         return f"Pedido {self.order_number} - {self.customer.get_full_name()}"
@@ -125,10 +216,90 @@ class Order(models.Model):
     def save(self, *args, **kwargs):
         """Gera número do pedido automaticamente"""
         if not self.order_number:
-            import random
-            import string
-            self.order_number = ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+            from .numbering import get_order_number_allocator
+            self.order_number = get_order_number_allocator().allocate()
+        
+        # Mantém o peso da prioridade alinhado com priority
+        self.priority_rank = self.PRIORITY_RANKS.get(self.priority, self.PRIORITY_RANKS['normal'])
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'priority' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'priority_rank'}
+        
+        # Mantém o documento de busca em dia quando algum campo buscado muda
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None:
+            rebuild = getattr(self, '_search_state', None) != self._search_fields_state()
+        else:
+            rebuild = bool(self.SEARCH_FIELDS.intersection(update_fields))
+        if rebuild:
+            from .search import build_search_document
+            self.search_document = build_search_document(
+                self.order_number, self._search_customer(), self.pickup_address, self.delivery_address
+            )
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'search_document'}
         super().save(*args, **kwargs)
+        self._search_state = self._search_fields_state()
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._search_state = instance._search_fields_state()
+        return instance
+    
+    def _search_fields_state(self):
+        """Valores dos campos buscados já carregados (campos adiados não disparam consulta)"""
+        return tuple(self.__dict__.get(name) for name in ('order_number', 'customer_id', 'pickup_address', 'delivery_address'))
+    
+    def _search_customer(self):
+        """Nome e e-mail do cliente para o documento de busca, evitando ler o usuário quando possível.
+
+        Usa, nesta ordem: o cliente já carregado no pedido, o ``search_customer`` informado
+        por quem cria o pedido (o CustomerRef do checkout) e, só em último caso, uma
+        consulta pelos três campos.
+        """
+        if Order.customer.is_cached(self):
+            return self.customer
+        customer = getattr(self, 'search_customer', None)
+        if customer is not None and customer.id == self.customer_id:
+            return customer
+        from users.services import CustomerRef
+        row = (
+            self._meta.get_field('customer').related_model.objects
+            .filter(id=self.customer_id)
+            .values_list('id', 'first_name', 'last_name', 'email')
+            .first()
+        )
+        return CustomerRef(*row) if row else None
+    
+    @classmethod
+    def accept_pending(cls, order_id, motoboy):
+        """Aceita o pedido para o motoboy se ainda estiver livre; retorna True se ele ganhou.
+
+        Um único UPDATE condicional (compare-and-swap): dois motoboys aceitando ao mesmo
+        tempo nunca sobrescrevem um ao outro, só um UPDATE encontra a linha pendente.
+        """
+        from django.utils import timezone
+        now = timezone.now()
+        updated = cls.objects.filter(
+            id=order_id,
+            status='pending',
+            motoboy__isnull=True
+        ).update(
+            motoboy=motoboy,
+            status='accepted',
+            accepted_at=now,
+            updated_at=now
+        )
+        return updated == 1
+    
+    @classmethod
+    def dispatch_queue(cls):
+        """Pedidos pendentes sem motoboy: maior prioridade primeiro, depois os mais antigos"""
+        return cls.objects.filter(
+            status='pending',
+            motoboy__isnull=True
+        ).order_by('-priority_rank', 'created_at', 'id')
     
     def get_pickup_coordinates(self):
         """Retorna coordenadas de retirada como tupla"""
@@ -195,3 +366,59 @@ class Order(models.Model):
             self.final_price = self.base_price + (float(self.distance_km) * price_per_km)
             self.save(update_fields=['final_price'])
         return self.final_price
+
+class OrderItem(models.Model):
+    """Item (linha) de um pedido, com preço congelado no momento da compra"""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items', verbose_name="Pedido")
+    product = models.ForeignKey('core.Product', on_delete=models.SET_NULL, null=True, blank=True, related_name='order_items', verbose_name="Produto")
+    product_name = models.CharField(max_length=200, verbose_name="Nome do produto")
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Preço unitário")
+    quantity = models.PositiveIntegerField(default=1, verbose_name="Quantidade")
+
+    class Meta:
+        verbose_name = "Item do Pedido"
+        verbose_name_plural = "Itens do Pedido"
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.product_name} x{self.quantity}"
+
+    @property
+    def total_price(self):
+        return self.unit_price * self.quantity
+
+class DispatchOffer(models.Model):
+    """Oferta de um pedido a um motoboy feita pelo despacho automático (expira sem resposta)"""
+
+    STATUS_CHOICES = [
+        ('offered', 'Oferecida'),
+        ('accepted', 'Aceita'),
+        ('declined', 'Recusada'),
+        ('expired', 'Expirada'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='dispatch_offers', verbose_name="Pedido")
+    motoboy = models.ForeignKey(Motoboy, on_delete=models.CASCADE, related_name='dispatch_offers', verbose_name="Motoboy")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='offered', verbose_name="Status")
+    distance_km = models.DecimalField(max_digits=6, decimal_places=2, verbose_name="Distância até a retirada (km)")
+    score = models.FloatField(verbose_name="Pontuação")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Data da oferta")
+    expires_at = models.DateTimeField(verbose_name="Expira em")
+    responded_at = models.DateTimeField(null=True, blank=True, verbose_name="Data da resposta")
+
+    class Meta:
+        verbose_name = "Oferta de Despacho"
+        verbose_name_plural = "Ofertas de Despacho"
+        ordering = ['-created_at']
+        constraints = [
+            # No máximo uma oferta em aberto por pedido e por motoboy
+            models.UniqueConstraint(fields=['order'], condition=models.Q(status='offered'), name='dispatch_offer_open_order'),
+            models.UniqueConstraint(fields=['motoboy'], condition=models.Q(status='offered'), name='dispatch_offer_open_motoboy'),
+        ]
+        indexes = [
+            # Expiração das ofertas em aberto a cada rodada
+            models.Index(fields=['expires_at'], condition=models.Q(status='offered'), name='dispatch_offer_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.order.order_number} → {self.motoboy.full_name} ({self.status})"
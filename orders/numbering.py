@@ -0,0 +1,86 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+import random
+import string
+import threading
+
+
+class RandomOrderNumberAllocator:
+    """Gerador antigo: 8 caracteres aleatórios (depende do índice único para colisões)"""
+
+    def allocate(self):
+        return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+
+
+class BlockOrderNumberAllocator:
+    """Números AAMMDD + sequência do dia, reservando blocos de valores por processo.
+
+    Cada thread reserva um bloco de ``block_size`` valores com um único UPDATE
+    na tabela OrderNumberSequence e distribui os números do bloco em memória, então
+    os workers do gunicorn nunca geram o mesmo número e não há consulta por pedido.
+    Se a reserva acontecer dentro de uma transação, o bloco só passa a ser reutilizado
+    depois do commit; se a transação for desfeita o bloco é descartado, já que outro
+    processo pode reservar a mesma faixa. Números não usados ficam como lacunas.
+    """
+
+    def __init__(self, block_size=None):
+        self.block_size = block_size or getattr(settings, 'ORDER_NUMBER_BLOCK_SIZE', 50)
+        self._state = threading.local()
+
+    def _reserve_block(self, day):
+        """Reserva [início, fim) da sequência do dia de forma atômica"""
+        from .models import OrderNumberSequence
+
+        with transaction.atomic():
+            OrderNumberSequence.objects.get_or_create(day=day)
+            OrderNumberSequence.objects.filter(day=day).update(
+                next_value=F('next_value') + self.block_size
+            )
+            # Lido na mesma transação que fez o UPDATE: a linha continua bloqueada
+            end = OrderNumberSequence.objects.filter(day=day).values_list('next_value', flat=True).get()
+        return end - self.block_size, end
+
+    def _confirm(self, block):
+        """Marca o bloco como gravado (chamado no commit da transação que o reservou)"""
+        if getattr(self._state, 'block', None) is block:
+            block['confirmed'] = True
+
+    def allocate(self):
+        day = timezone.localdate()
+        block = getattr(self._state, 'block', None)
+
+        if block is None or block['day'] != day or block['next'] >= block['end'] or not block['confirmed']:
+            start, end = self._reserve_block(day)
+            block = {'day': day, 'next': start, 'end': end, 'confirmed': False}
+            self._state.block = block
+            # Fora de transação o on_commit roda na hora
+            transaction.on_commit(lambda: self._confirm(block))
+
+        value = block['next']
+        block['next'] += 1
+        return f'{day:%y%m%d}{value:06d}'
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_order_number_allocator():
+    """Retorna o alocador configurado em settings.ORDER_NUMBER_ALLOCATOR (um por processo)"""
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = import_string(settings.ORDER_NUMBER_ALLOCATOR)()
+    return _allocator
+
+
+def set_order_number_allocator(allocator):
+    """Troca o alocador do processo (benchmarks e testes) e devolve o anterior"""
+    global _allocator
+    with _allocator_lock:
+        previous, _allocator = _allocator, allocator
+    return previous
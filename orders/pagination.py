@@ -0,0 +1,47 @@
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+import base64
+import uuid
+
+
+class InvalidCursor(ValueError):
+    """Cursor de paginação malformado"""
+
+
+def encode_cursor(order):
+    """Cursor opaco com a posição (created_at, id) do último pedido da página"""
+    raw = f'{order.created_at.isoformat()}|{order.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Converte o cursor de volta em (created_at, id)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split('|')
+        created_at = parse_datetime(created_at)
+        pk = uuid.UUID(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor('Cursor de paginação inválido')
+    if created_at is None:
+        raise InvalidCursor('Cursor de paginação inválido')
+    return created_at, pk
+
+
+def keyset_page(queryset, cursor=None, page_size=50):
+    """Página de pedidos ordenados por (-created_at, -id) a partir do cursor.
+
+    Em vez de OFFSET, filtra os pedidos estritamente depois do último visto, então o
+    índice (created_at, id) atende qualquer página com o mesmo custo. Busca um registro
+    a mais para saber se existe próxima página. Retorna (pedidos, próximo cursor ou None).
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+    rows = list(queryset[:page_size + 1])
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
@@ -0,0 +1,143 @@
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+
+# Tabela FTS5 (SQLite) e índice de trigramas (PostgreSQL) sobre Order.search_document
+FTS_TABLE = 'orders_order_fts'
+TRIGRAM_INDEX = 'orders_order_search_trgm'
+
+# O tokenizer de trigramas só encontra termos com 3 caracteres ou mais
+MIN_FTS_QUERY_LENGTH = 3
+
+_SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': f"""
+        CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON orders_order BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.search_key, new.search_document);
+        END
+    """,
+    f'{FTS_TABLE}_ad': f"""
+        CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON orders_order BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.search_key, old.search_document);
+        END
+    """,
+    f'{FTS_TABLE}_au': f"""
+        CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF search_document ON orders_order BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, search_document) VALUES ('delete', old.search_key, old.search_document);
+            INSERT INTO {FTS_TABLE}(rowid, search_document) VALUES (new.search_key, new.search_document);
+        END
+    """,
+}
+
+# None = ainda não verificado neste processo
+_fts_available = None
+
+
+def build_search_document(order_number, customer, pickup_address, delivery_address):
+    """Texto único com tudo que a busca da equipe consulta (pedido + cliente)"""
+    parts = [
+        order_number,
+        customer.first_name if customer else '',
+        customer.last_name if customer else '',
+        customer.email if customer else '',
+        pickup_address,
+        delivery_address,
+    ]
+    return ' '.join(part for part in parts if part)
+
+
+def ensure_search_index(using_connection=None):
+    """Cria (ou recria) o índice de busca do banco em uso.
+
+    SQLite: tabela FTS5 com tokenizer de trigramas ligada a orders_order por triggers.
+    O rowid da FTS5 é a coluna search_key, não o rowid implícito de orders_order (que
+    é renumerado por VACUUM numa tabela com chave UUID e dessincronizaria o índice).
+    Migrations que recriam orders_order no SQLite apagam os triggers, por isso esta função
+    roda a cada migrate e reconstrói o índice quando precisou recriar algo.
+    PostgreSQL: índice GIN de trigramas (pg_trgm), usado pelo ILIKE da busca.
+    """
+    global _fts_available
+    conn = using_connection or connection
+
+    with conn.cursor() as cursor:
+        # Banco ainda (ou de volta) numa migration anterior à coluna search_document
+        if 'orders_order' not in conn.introspection.table_names(cursor):
+            return
+        columns = {column.name for column in conn.introspection.get_table_description(cursor, 'orders_order')}
+        if not {'search_document', 'search_key'} <= columns:
+            return
+
+        if conn.vendor == 'sqlite':
+            cursor.execute("SELECT name FROM sqlite_master WHERE name LIKE %s", [f'{FTS_TABLE}%'])
+            existing = {row[0] for row in cursor.fetchall()}
+            missing_triggers = [name for name in _SQLITE_TRIGGERS if name not in existing]
+            if FTS_TABLE in existing and not missing_triggers:
+                return
+            if FTS_TABLE not in existing:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5("
+                    f"search_document, content='orders_order', content_rowid='search_key', tokenize='trigram')"
+                )
+            for name in missing_triggers:
+                cursor.execute(_SQLITE_TRIGGERS[name])
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        elif conn.vendor == 'postgresql':
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} "
+                f"ON orders_order USING gin (search_document gin_trgm_ops)"
+            )
+
+    _fts_available = None
+
+
+def drop_search_index(using_connection=None):
+    """Remove o índice de busca (usado ao desfazer a migration do search_document)"""
+    global _fts_available
+    conn = using_connection or connection
+
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            for name in _SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+        elif conn.vendor == 'postgresql':
+            cursor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+    _fts_available = None
+
+
+def has_fts():
+    """Verifica (uma vez por processo) se a tabela FTS5 existe no SQLite"""
+    global _fts_available
+    if _fts_available is None:
+        if connection.vendor != 'sqlite':
+            _fts_available = False
+        else:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+                _fts_available = cursor.fetchone() is not None
+    return _fts_available
+
+
+def search_orders(queryset, query):
+    """Filtra pedidos pelo documento de busca.
+
+    No SQLite usa MATCH na tabela FTS5 (a frase vira uma busca por trecho de texto);
+    nos outros bancos usa ILIKE numa única coluna, que o índice de trigramas do
+    PostgreSQL atende. Termos curtos demais para trigramas caem no ILIKE.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+
+    if has_fts() and len(query) >= MIN_FTS_QUERY_LENGTH:
+        phrase = '"' + query.replace('"', '""') + '"'
+        return queryset.alias(
+            search_match=RawSQL(
+                f"orders_order.search_key IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)",
+                [phrase],
+                output_field=BooleanField(),
+            )
+        ).filter(search_match=True)
+
+    return queryset.filter(search_document__icontains=query)
@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import MenuItem, Order
+from .cart import invalidate_price_table
+from .search import build_search_document
+
+
+@receiver(post_save, sender=MenuItem)
+@receiver(post_delete, sender=MenuItem)
+def invalidate_menu_item_prices(sender, **kwargs):
+    """Invalida a tabela de preços do carrinho quando um item do cardápio muda"""
+    invalidate_price_table()
+
+
+# Campos do usuário que entram no documento de busca dos pedidos
+CUSTOMER_SEARCH_FIELDS = {'first_name', 'last_name', 'email'}
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def refresh_customer_search_documents(sender, instance, created, update_fields=None, **kwargs):
+    """Atualiza o documento de busca dos pedidos quando nome ou e-mail do cliente muda"""
+    if created or (update_fields is not None and not CUSTOMER_SEARCH_FIELDS.intersection(update_fields)):
+        return
+
+    orders = list(
+        Order.objects.filter(customer=instance)
+        .only('id', 'order_number', 'pickup_address', 'delivery_address', 'search_document')
+    )
+    changed = []
+    for order in orders:
+        document = build_search_document(order.order_number, instance, order.pickup_address, order.delivery_address)
+        if document != order.search_document:
+            order.search_document = document
+            changed.append(order)
+    if changed:
+        Order.objects.bulk_update(changed, ['search_document'], batch_size=500)
@@ -1,3 +1,84 @@
+from datetime import datetime, timedelta
+from unittest import skipUnless
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from users.models import User
+from .models import Order
 
-# Create your tests here.
+
+@skipUnless(connection.vendor == 'sqlite', 'Plano de consulta verificado no SQLite (banco usado em produção)')
+class OrderQueryPlanTests(TestCase):
+    """Garante que as consultas quentes de Order continuam usando os índices compostos"""
+
+    def query_plan(self, queryset):
+        """Linhas do EXPLAIN QUERY PLAN do queryset"""
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = self.query_plan(queryset)
+        self.assertTrue(
+            any(f'INDEX {index_name}' in step for step in plan),
+            f'Esperava o índice {index_name}, plano: {plan}'
+        )
+        self.assertFalse(
+            any(step.startswith('SCAN orders_order') and 'INDEX' not in step for step in plan),
+            f'Varredura completa de orders_order, plano: {plan}'
+        )
+
+    def test_dispatch_queue_uses_partial_index(self):
+        # motoboys.views.motoboy_dashboard (pedidos disponíveis)
+        queryset = Order.dispatch_queue()
+        self.assertUsesIndex(queryset, 'order_dispatch_queue_idx')
+        self.assertFalse(any('TEMP B-TREE' in step for step in self.query_plan(queryset)))
+        # Top-N de ids da fila sai só do índice, sem ler a tabela
+        top_ids = queryset.values_list('id', flat=True)[:20]
+        self.assertTrue(any('COVERING INDEX order_dispatch_queue_idx' in step for step in self.query_plan(top_ids)))
+
+    def test_motoboy_active_orders_use_motoboy_index(self):
+        # motoboys.views.motoboy_dashboard (pedidos do motoboy)
+        queryset = Order.objects.filter(
+            motoboy_id='00000000000000000000000000000000'
+        ).exclude(
+            status__in=['delivered', 'cancelled', 'failed']
+        ).order_by('-created_at')
+        self.assertUsesIndex(queryset, 'order_motoboy_created_idx')
+
+    def test_customer_history_uses_customer_index(self):
+        # users.views.user_dashboard / user_orders
+        queryset = Order.objects.filter(customer_id=1).order_by('-created_at')
+        self.assertUsesIndex(queryset, 'order_customer_created_idx')
+        self.assertUsesIndex(queryset.filter(status='delivered'), 'order_customer_created_idx')
+
+    def test_daily_stats_use_created_at_index(self):
+        # core.models.DeliveryStatistics.generate_daily_stats
+        day_start = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+        queryset = Order.objects.filter(
+            created_at__gte=day_start,
+            created_at__lt=day_start + timedelta(days=1)
+        )
+        self.assertUsesIndex(queryset, 'order_created_id_idx')
+        self.assertUsesIndex(queryset.filter(status='delivered'), 'order_created_id_idx')
+
+
+class DispatchQueueTests(TestCase):
+    """Ordem da fila de pedidos disponíveis"""
+
+    def test_queue_follows_business_priority_then_age(self):
+        customer = User.objects.create(username='fila@x.com', email='fila@x.com')
+        for priority in ['normal', 'urgent', 'low', 'high', 'urgent']:
+            Order.objects.create(
+                customer=customer,
+                pickup_address='Restaurante',
+                delivery_address='Rua 1000',
+                description='Pedido',
+                base_price=10,
+                priority=priority,
+            )
+
+        queue = list(Order.dispatch_queue())
+        self.assertEqual([order.priority for order in queue], ['urgent', 'urgent', 'high', 'normal', 'low'])
+        self.assertLess(queue[0].created_at, queue[1].created_at)
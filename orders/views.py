@@ -4,119 +4,104 @@ from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
-from django.db.models import Q
 from django.conf import settings
-from .models import Order, MenuItem, CartItem
+from .models import Order
+from .cart import get_cart, clean_quantity
+from .geocoding import geocode
+from .zones import lookup_zone
+from .checkout import place_order, CheckoutError
+from .idempotency import idempotent
+from .pagination import keyset_page, InvalidCursor
+from .search import search_orders
+from .delivery import (
+    RESTAURANT_COORDS, EARTH_RADIUS_KM, RATE_PER_KM, DEFAULT_DELIVERY_FEE, MAX_BATCH_SIZE,
+    quote_coordinates, route_distances, delivery_fees,
+)
 from users.models import User
+from users.services import resolve_customer
 from motoboys.models import Motoboy
+from decimal import Decimal
 import json
 
 def get_cart_items(request):
     """Obtém itens do carrinho baseado na sessão"""
-    session_key = request.session.session_key
-    if not session_key:
-        request.session.create()
-        session_key = request.session.session_key
-    
-    return CartItem.objects.filter(session_key=session_key).select_related('menu_item')
+    return get_cart(request).lines()
 
-def get_cart_total(request, delivery_address=None):
+def get_cart_total(request, delivery_address=None, cart=None, quote=None):
     """Calcula o total do carrinho com taxa de entrega baseada na distância"""
-    cart_items = get_cart_items(request)
-    subtotal = sum(float(item.total_price) for item in cart_items)
+    summary = (cart or get_cart(request)).summary()
+    subtotal = summary['subtotal']
     
-    # Calcula taxa de entrega baseada na distância
-    delivery_fee = calculate_delivery_fee(delivery_address) if delivery_address else 5.00
+    # Calcula taxa de entrega baseada na distância (endereço resolvido uma única vez)
+    if delivery_address and quote is None:
+        quote = quote_delivery(delivery_address)
+    delivery_fee = quote['delivery_fee'] if quote else DEFAULT_DELIVERY_FEE
     
-    total = subtotal + delivery_fee
+    # Soma em Decimal; converte para float apenas na resposta
+    total = subtotal + Decimal(str(delivery_fee))
     return {
-        'subtotal': subtotal,
+        'subtotal': float(subtotal),
         'delivery_fee': delivery_fee,
-        'total': total,
-        'distance_km': get_delivery_distance(delivery_address) if delivery_address else 0
+        'total': float(total),
+        'distance_km': quote['distance_km'] if quote else 0,
+        'item_count': summary['item_count'],
+        'line_count': summary['line_count']
     }
 
-def calculate_delivery_fee(delivery_address):
-    """Calcula taxa de entrega baseada na distância real"""
-    if not delivery_address:
-        return 5.00  # Taxa mínima
+def quote_delivery(delivery_address):
+    """Calcula distância e taxa de entrega resolvendo o endereço uma única vez"""
+    # Prefixos de CEP conhecidos vêm direto da tabela de zonas pré-calculada
+    zone = lookup_zone(delivery_address)
+    if zone:
+        return {
+            'distance_km': zone['distance_km'],
+            'delivery_fee': zone['delivery_fee']
+        }
     
     distance_km = get_delivery_distance(delivery_address)
+    return {
+        'distance_km': distance_km,
+        'delivery_fee': calculate_delivery_fee(delivery_address, distance_km=distance_km)
+    }
+
+def calculate_delivery_fee(delivery_address, distance_km=None):
+    """Calcula taxa de entrega baseada na distância real"""
+    if not delivery_address:
+        return DEFAULT_DELIVERY_FEE  # Taxa mínima
     
-    # Taxa por km (R$ 2,50 por km)
-    rate_per_km = 2.50
-    # Taxa base mínima
-    base_fee = 3.00
-    
-    delivery_fee = base_fee + (distance_km * rate_per_km)
+    if distance_km is None:
+        distance_km = get_delivery_distance(delivery_address)
     
-    # Arredonda para 2 casas decimais
-    return round(delivery_fee, 2)
+    # Mesmo cálculo (e arredondamento) da cotação em lote e da tabela de zonas
+    return float(delivery_fees([distance_km])[0])
 
 def get_delivery_distance(delivery_address):
     """Calcula distância real entre restaurante e endereço de entrega"""
     if not delivery_address:
         return 0
     
-    # Coordenadas do restaurante (exemplo: Lisboa)
-    restaurant_coords = {
-        'lat': 38.7223,
-        'lng': -9.1393,
-        'address': 'Rua Augusta, 123, Baixa, Lisboa'
-    }
-    
     # Simula cálculo de rota real usando OpenStreetMap
     # Em produção, você usaria a API do OSRM ou Google Maps Directions
     
-    # Coordenadas do endereço de entrega (baseado no CEP)
-    delivery_coords = get_coordinates_from_address(delivery_address)
+    # Coordenadas do endereço de entrega (baseado no CEP, memoizado)
+    delivery_coords = geocode(delivery_address)
     
     if not delivery_coords:
         return 0
     
-    # Calcula distância em linha reta primeiro
-    straight_distance = calculate_straight_line_distance(
-        restaurant_coords['lat'], restaurant_coords['lng'],
-        delivery_coords['lat'], delivery_coords['lng']
-    )
-    
-    # Aplica fator de correção para rotas reais (considera curvas, vias, etc.)
-    # Fator típico: 1.3 a 1.5 (30-50% a mais que distância em linha reta)
-    route_factor = 1.4
-    
-    real_distance = straight_distance * route_factor
-    
-    return round(real_distance, 2)
+    # Distância em linha reta com fator de correção para rotas reais (ROUTE_FACTOR),
+    # arredondada da mesma forma que a cotação em lote
+    return float(route_distances([delivery_coords['lat']], [delivery_coords['lng']])[0])
 
 def get_coordinates_from_address(address):
     """Obtém coordenadas do endereço baseado no CEP"""
-    # Mapeamento de CEPs para coordenadas (simulado)
-    cep_coordinates = {
-        '1000': {'lat': 38.7223, 'lng': -9.1393, 'city': 'Lisboa'},
-        '2000': {'lat': 39.2362, 'lng': -8.6869, 'city': 'Santarém'},
-        '3000': {'lat': 40.2033, 'lng': -8.4103, 'city': 'Coimbra'},
-        '4000': {'lat': 41.1579, 'lng': -8.6291, 'city': 'Porto'},
-        '5000': {'lat': 41.2956, 'lng': -7.7463, 'city': 'Vila Real'},
-        '6000': {'lat': 39.8222, 'lng': -7.4909, 'city': 'Castelo Branco'},
-        '7000': {'lat': 38.5714, 'lng': -7.9135, 'city': 'Évora'},
-        '8000': {'lat': 37.0194, 'lng': -7.9304, 'city': 'Faro'},
-        '9000': {'lat': 32.6669, 'lng': -16.9241, 'city': 'Funchal'}
-    }
-    
-    # Extrai CEP do endereço
-    import re
-    cep_match = re.search(r'(\d{4})', address)
-    if cep_match:
-        cep_prefix = cep_match.group(1)
-        return cep_coordinates.get(cep_prefix)
-    
-    return None
+    return geocode(address)
 
 def calculate_straight_line_distance(lat1, lng1, lat2, lng2):
     """Calcula distância em linha reta entre dois pontos (fórmula de Haversine)"""
     import math
     
-    R = 6371  # Raio da Terra em km
+    R = EARTH_RADIUS_KM
     
     lat1, lng1 = math.radians(lat1), math.radians(lng1)
     lat2, lng2 = math.radians(lat2), math.radians(lng2)
@@ -140,29 +125,13 @@ def add_to_cart(request):
             item_id = data.get('item_id')
             quantity = data.get('quantity', 1)
             
-            menu_item = get_object_or_404(MenuItem, id=item_id, is_available=True)
-            
-            # Garante que a sessão existe
-            if not request.session.session_key:
-                request.session.create()
-            
-            # Adiciona ou atualiza item no carrinho
-            cart_item, created = CartItem.objects.get_or_create(
-                session_key=request.session.session_key,
-                menu_item=menu_item,
-                defaults={'quantity': quantity}
-            )
-            
-            if not created:
-                cart_item.quantity = int(cart_item.quantity) + int(quantity)
-                cart_item.save()
-            
-            cart_data = get_cart_total(request)
-            cart_data['item_count'] = get_cart_items(request).count()
+            cart = get_cart(request)
+            item_name = cart.add(item_id, quantity)
+            cart_data = get_cart_total(request, cart=cart)
             
             return JsonResponse({
                 'success': True,
-                'message': f'{menu_item.name} adicionado ao carrinho!',
+                'message': f'{item_name} adicionado ao carrinho!',
                 'cart': cart_data
             })
             
@@ -181,20 +150,12 @@ def update_cart_item(request):
         try:
             data = json.loads(request.body)
             item_id = data.get('item_id')
-            quantity = data.get('quantity', 1)
-            
-            cart_item = get_object_or_404(CartItem, id=item_id, session_key=request.session.session_key)
+            quantity = clean_quantity(data.get('quantity', 1), minimum=None)
             
-            if quantity <= 0:
-                cart_item.delete()
-                message = 'Item removido do carrinho'
-            else:
-                cart_item.quantity = quantity
-                cart_item.save()
-                message = 'Carrinho atualizado'
-            
-            cart_data = get_cart_total(request)
-            cart_data['item_count'] = get_cart_items(request).count()
+            cart = get_cart(request)
+            cart.update(item_id, quantity)
+            message = 'Item removido do carrinho' if quantity <= 0 else 'Carrinho atualizado'
+            cart_data = get_cart_total(request, cart=cart)
             
             return JsonResponse({
                 'success': True,
@@ -218,12 +179,9 @@ def remove_from_cart(request):
             data = json.loads(request.body)
             item_id = data.get('item_id')
             
-            cart_item = get_object_or_404(CartItem, id=item_id, session_key=request.session.session_key)
-            item_name = cart_item.menu_item.name
-            cart_item.delete()
-            
-            cart_data = get_cart_total(request)
-            cart_data['item_count'] = get_cart_items(request).count()
+            cart = get_cart(request)
+            item_name = cart.remove(item_id)
+            cart_data = get_cart_total(request, cart=cart)
             
             return JsonResponse({
                 'success': True,
@@ -239,6 +197,50 @@ def remove_from_cart(request):
     
     return JsonResponse({'success': False, 'message': 'Método não permitido'}, status=405)
 
+@csrf_exempt
+def batch_update_cart(request):
+    """Aplica várias operações no carrinho (add/update/remove) numa única requisição"""
+    if request.method == 'POST':
+        try:
+            data = json.loads(request.body)
+            operations = data.get('operations', [])
+            
+            if not isinstance(operations, list) or not operations:
+                return JsonResponse({
+                    'success': False,
+                    'message': 'Nenhuma operação informada'
+                }, status=400)
+            
+            cart = get_cart(request)
+            cart.apply(operations)
+            cart_data = get_cart_total(request, cart=cart)
+            cart_data['items'] = [
+                {
+                    'id': line['id'],
+                    'menu_item_id': line['menu_item_id'],
+                    'name': line['name'],
+                    'price': float(line['price']),
+                    'quantity': line['quantity'],
+                    'total_price': float(line['total_price'])
+                }
+                for line in cart.lines()
+            ]
+            
+            return JsonResponse({
+                'success': True,
+                'message': f'{len(operations)} operação(ões) aplicada(s) ao carrinho',
+                'cart': cart_data
+            })
+            
+        except Exception as e:
+            return JsonResponse({
+                'success': False,
+                'message': f'Erro ao atualizar carrinho: {str(e)}'
+            }, status=400)
+    
+    return JsonResponse({'success': False, 'message': 'Método não permitido'}, status=405)
+
+@idempotent
 def create_order(request):
     """View para criação de pedidos"""
     # GET request - mostra formulário de checkout
@@ -297,52 +299,17 @@ def create_order(request):
                     'message': 'Carrinho vazio'
                 }, status=400)
             
-            # Cria ou obtém o usuário baseado no email
-            customer_email = data['customer_email']
-            customer, created = User.objects.get_or_create(
-                email=customer_email,
-                defaults={
-                    'username': customer_email,
-                    'first_name': data['customer_name'].split()[0] if data['customer_name'] else '',
-                    'last_name': ' '.join(data['customer_name'].split()[1:]) if len(data['customer_name'].split()) > 1 else '',
-                    'phone_number': data['customer_phone'],
-                    'address': data['delivery_address'],
-                }
+            # Resolve o cliente pelo email (cache para quem já comprou, upsert no primeiro pedido)
+            customer = resolve_customer(
+                data['customer_email'],
+                full_name=data['customer_name'],
+                phone=data['customer_phone'],
+                address=data['delivery_address'],
             )
             
-            # Calcula total do carrinho
-            subtotal = sum(float(item['price']) * int(item['quantity']) for item in cart_data)
-            delivery_fee = 5.00  # Taxa fixa por enquanto
-            total = subtotal + delivery_fee
-            
-            # Cria o pedido
-            order = Order.objects.create(
-                customer=customer,
-                pickup_address="Restaurante MotoDelivery",  # Endereço fixo
-                delivery_address=data['delivery_address'],
-                description=f"Pedido com {len(cart_data)} itens",
-                weight=0.5,  # Peso padrão
-                dimensions='Padrão',
-                is_fragile=False,
-                priority='normal',
-                base_price=total,
-                distance_km=0  # Será calculado depois
-            )
-            
-            # Cria os itens do pedido
-            from core.models import Product
-            
-            for cart_item in cart_data:
-                try:
-                    product = Product.objects.get(id=cart_item['id'])
-                    # Aqui você criaria OrderItem se tivesse esse modelo
-                    # Por enquanto, vamos salvar os detalhes no description
-                    order.description += f"\n- {cart_item['name']} x{cart_item['quantity']} - R$ {cart_item['price']}"
-                except Product.DoesNotExist:
-                    # Se o produto não existir, salva apenas o nome
-                    order.description += f"\n- {cart_item['name']} x{cart_item['quantity']} - R$ {cart_item['price']}"
-            
-            order.save()
+            # Valida preços no servidor e cria pedido + itens numa transação
+            # (taxa fixa por enquanto)
+            order = place_order(customer, data, cart_data, delivery_fee=DEFAULT_DELIVERY_FEE)
             
             return JsonResponse({
                 'success': True,
@@ -350,6 +317,11 @@ def create_order(request):
                 'order_id': order.id
             })
             
+        except CheckoutError as e:
+            return JsonResponse({
+                'success': False,
+                'message': str(e)
+            }, status=400)
         except Exception as e:
             return JsonResponse({
                 'success': False,
@@ -365,53 +337,100 @@ def create_order(request):
     print(f"🔍 DEBUG: Context enviado: {context}")
     return render(request, 'orders/create_order.html', context)
 
+def filter_orders(request):
+    """Aplica os filtros da lista de pedidos (status, prioridade, busca) da query string"""
+    filters = {
+        'status': request.GET.get('status', ''),
+        'priority': request.GET.get('priority', ''),
+        'search': request.GET.get('search', ''),
+    }
+    
+    # Cliente e motoboy vêm no mesmo SELECT (o template acessa os dois em cada linha)
+    orders = Order.objects.select_related('customer', 'motoboy')
+    
+    # Aplica filtros
+    if filters['status']:
+        orders = orders.filter(status=filters['status'])
+    
+    if filters['priority']:
+        orders = orders.filter(priority=filters['priority'])
+    
+    if filters['search']:
+        # Índice de busca (FTS5 no SQLite, trigramas no PostgreSQL) em vez de seis icontains
+        orders = search_orders(orders, filters['search'])
+    
+    return orders, filters
+
+def get_page_size(request):
+    """Tamanho da página pedido na query string, limitado a ORDER_LIST_MAX_PAGE_SIZE"""
+    default = getattr(settings, 'ORDER_LIST_PAGE_SIZE', 50)
+    try:
+        page_size = int(request.GET.get('page_size', default))
+    except ValueError:
+        page_size = default
+    return max(1, min(page_size, getattr(settings, 'ORDER_LIST_MAX_PAGE_SIZE', 200)))
+
 @login_required
 def order_list(request):
-    """Lista de pedidos (para admin)"""
+    """Lista de pedidos (para admin), paginada por cursor"""
     # Verifica se é staff
     if not request.user.is_staff:
         messages.error(request, 'Acesso negado.')
         return redirect('user_dashboard')
     
-    # Filtros
-    status_filter = request.GET.get('status', '')
-    priority_filter = request.GET.get('priority', '')
-    search_query = request.GET.get('search', '')
-    
-    orders = Order.objects.all()
-    
-    # Aplica filtros
-    if status_filter:
-        orders = orders.filter(status=status_filter)
-    
-    if priority_filter:
-        orders = orders.filter(priority=priority_filter)
-    
-    if search_query:
-        orders = orders.filter(
-            Q(order_number__icontains=search_query) |
-            Q(customer__first_name__icontains=search_query) |
-            Q(customer__last_name__icontains=search_query) |
-            Q(customer__email__icontains=search_query) |
-            Q(pickup_address__icontains=search_query) |
-            Q(delivery_address__icontains=search_query)
-        )
+    orders, filters = filter_orders(request)
     
-    orders = orders.order_by('-created_at')
+    try:
+        orders, next_cursor = keyset_page(orders, request.GET.get('cursor'), get_page_size(request))
+    except InvalidCursor:
+        orders, next_cursor = keyset_page(orders, None, get_page_size(request))
     
     context = {
         'orders': orders,
+        'next_cursor': next_cursor,
         'status_choices': Order.STATUS_CHOICES,
         'priority_choices': Order.PRIORITY_CHOICES,
-        'current_filters': {
-            'status': status_filter,
-            'priority': priority_filter,
-            'search': search_query
-        }
+        'current_filters': filters
     }
     
     return render(request, 'orders/order_list.html', context)
 
+@login_required
+def order_list_json(request):
+    """Lista de pedidos em JSON para rolagem infinita (mesmos filtros e cursor da lista)"""
+    if not request.user.is_staff:
+        return JsonResponse({'success': False, 'message': 'Acesso negado'}, status=403)
+    
+    orders, filters = filter_orders(request)
+    
+    try:
+        orders, next_cursor = keyset_page(orders, request.GET.get('cursor'), get_page_size(request))
+    except InvalidCursor as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    
+    return JsonResponse({
+        'success': True,
+        'orders': [
+            {
+                'id': str(order.id),
+                'order_number': order.order_number,
+                'status': order.status,
+                'status_display': order.get_status_display(),
+                'priority': order.priority,
+                'priority_display': order.get_priority_display(),
+                'customer_name': order.customer.get_full_name(),
+                'customer_email': order.customer.email,
+                'motoboy_name': order.motoboy.full_name if order.motoboy else None,
+                'delivery_address': order.delivery_address,
+                'base_price': float(order.base_price),
+                'created_at': order.created_at.isoformat(),
+            }
+            for order in orders
+        ],
+        'next_cursor': next_cursor,
+        'has_next': next_cursor is not None,
+    })
+
 @login_required
 def order_detail(request, order_id):
     """Detalhes de um pedido específico"""
@@ -442,12 +461,13 @@ def calculate_delivery_fee_ajax(request):
                 'message': 'Endereço de entrega é obrigatório'
             }, status=400)
         
-        # Calcula distância e taxa
-        distance_km = get_delivery_distance(delivery_address)
-        delivery_fee = calculate_delivery_fee(delivery_address)
+        # Calcula distância e taxa (endereço resolvido uma única vez)
+        quote = quote_delivery(delivery_address)
+        distance_km = quote['distance_km']
+        delivery_fee = quote['delivery_fee']
         
         # Obtém dados do carrinho
-        cart_data = get_cart_total(request, delivery_address)
+        cart_data = get_cart_total(request, delivery_address, quote=quote)
         
         return JsonResponse({
             'success': True,
@@ -455,7 +475,7 @@ def calculate_delivery_fee_ajax(request):
             'delivery_fee': delivery_fee,
             'cart_total': cart_data,
             'route_info': {
-                'restaurant_address': 'Rua Augusta, 123, Baixa, Lisboa',
+                'restaurant_address': RESTAURANT_COORDS['address'],
                 'delivery_address': delivery_address,
                 'estimated_time': f'{int(distance_km * 2)}-{int(distance_km * 3)} min'
             }
@@ -472,6 +492,64 @@ def calculate_delivery_fee_ajax(request):
             'message': f'Erro ao calcular taxa de entrega: {str(e)}'
         }, status=500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def calculate_delivery_fee_batch(request):
+    """Calcula distância e taxa de entrega para vários endereços/coordenadas de uma vez"""
+    try:
+        data = json.loads(request.body)
+        addresses = data.get('addresses') or []
+        coordinates = data.get('coordinates') or []
+        
+        if not addresses and not coordinates:
+            return JsonResponse({
+                'success': False,
+                'message': 'Informe endereços ou coordenadas'
+            }, status=400)
+        
+        if len(addresses) + len(coordinates) > MAX_BATCH_SIZE:
+            return JsonResponse({
+                'success': False,
+                'message': f'Máximo de {MAX_BATCH_SIZE} pontos por requisição'
+            }, status=400)
+        
+        # Endereços são resolvidos pelo cache de geocodificação; sem CEP conhecido vira NaN (distância 0)
+        points = []
+        for address in addresses:
+            coords = geocode(address)
+            points.append((coords['lat'], coords['lng']) if coords else (float('nan'), float('nan')))
+        for point in coordinates:
+            points.append((float(point[0]), float(point[1])))
+        
+        latitudes, longitudes = zip(*points)
+        distances, fees = quote_coordinates(latitudes, longitudes)
+        
+        labels = list(addresses) + [list(point) for point in coordinates]
+        return JsonResponse({
+            'success': True,
+            'count': len(points),
+            'quotes': [
+                {'input': label, 'distance_km': float(distance), 'delivery_fee': float(fee)}
+                for label, distance, fee in zip(labels, distances, fees)
+            ]
+        })
+        
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'message': 'Dados inválidos'
+        }, status=400)
+    except (TypeError, ValueError, IndexError):
+        return JsonResponse({
+            'success': False,
+            'message': 'Coordenadas inválidas'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'message': f'Erro ao calcular taxas de entrega: {str(e)}'
+        }, status=500)
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def calculate_distance(request):
@@ -490,24 +568,14 @@ def calculate_distance(request):
             }, status=400)
         
         # Cálculo simples de distância (fórmula de Haversine)
-        import math
-        
-        R = 6371  # Raio da Terra em km
-        
-        lat1, lon1 = math.radians(float(pickup_lat)), math.radians(float(pickup_lng))
-        lat2, lon2 = math.radians(float(delivery_lat)), math.radians(float(delivery_lng))
-        
-        dlat = lat2 - lat1
-        dlon = lon2 - lon1
-        
-        a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-        c = 2 * math.asin(math.sqrt(a))
-        
-        distance = R * c
+        distance = calculate_straight_line_distance(
+            float(pickup_lat), float(pickup_lng),
+            float(delivery_lat), float(delivery_lng)
+        )
         
         # Calcula preço estimado (R$ 2,50 por km + taxa base de R$ 5,00)
-        base_price = 5.00
-        estimated_price = base_price + (distance * 2.50)
+        base_price = DEFAULT_DELIVERY_FEE
+        estimated_price = base_price + (distance * RATE_PER_KM)
         
         return JsonResponse({
             'success': True,
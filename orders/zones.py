@@ -0,0 +1,81 @@
+from django.db import transaction
+from .delivery import RESTAURANT_COORDS, ROUTE_FACTOR, BASE_FEE, RATE_PER_KM, quote_coordinates
+from .geocoding import CEP_COORDINATES, extract_cep_prefix
+import hashlib
+import json
+
+# Tabela carregada em memória por processo: {prefixo: {'distance_km', 'delivery_fee', 'city'}}
+_zone_table = None
+
+
+def pricing_signature():
+    """Assinatura das constantes de preço; muda quando a tabela precisa ser recalculada"""
+    constants = {
+        'restaurant': [RESTAURANT_COORDS['lat'], RESTAURANT_COORDS['lng']],
+        'route_factor': ROUTE_FACTOR,
+        'base_fee': BASE_FEE,
+        'rate_per_km': RATE_PER_KM,
+        'zones': CEP_COORDINATES,
+    }
+    return hashlib.sha256(json.dumps(constants, sort_keys=True).encode()).hexdigest()
+
+
+def rebuild_zones():
+    """Recalcula todas as zonas numa passada vetorizada e grava em DeliveryZone"""
+    from .models import DeliveryZone
+    global _zone_table
+
+    prefixes = sorted(CEP_COORDINATES)
+    distances, fees = quote_coordinates(
+        [CEP_COORDINATES[prefix]['lat'] for prefix in prefixes],
+        [CEP_COORDINATES[prefix]['lng'] for prefix in prefixes],
+    )
+    signature = pricing_signature()
+
+    zones = [
+        DeliveryZone(
+            cep_prefix=prefix,
+            city=CEP_COORDINATES[prefix].get('city', ''),
+            latitude=CEP_COORDINATES[prefix]['lat'],
+            longitude=CEP_COORDINATES[prefix]['lng'],
+            distance_km=round(float(distance), 2),
+            delivery_fee=round(float(fee), 2),
+            pricing_signature=signature,
+        )
+        for prefix, distance, fee in zip(prefixes, distances, fees)
+    ]
+    with transaction.atomic():
+        DeliveryZone.objects.all().delete()
+        DeliveryZone.objects.bulk_create(zones)
+
+    _zone_table = None
+    return zones
+
+
+def get_zone_table():
+    """Retorna a tabela de zonas, recalculando só se as constantes de preço mudaram"""
+    from .models import DeliveryZone
+    global _zone_table
+
+    if _zone_table is None:
+        signature = pricing_signature()
+        zones = list(DeliveryZone.objects.all())
+        if not zones or any(zone.pricing_signature != signature for zone in zones):
+            zones = rebuild_zones()
+        _zone_table = {
+            zone.cep_prefix: {
+                'distance_km': float(zone.distance_km),
+                'delivery_fee': float(zone.delivery_fee),
+                'city': zone.city,
+            }
+            for zone in zones
+        }
+    return _zone_table
+
+
+def lookup_zone(address):
+    """Busca O(1) da zona de entrega pelo prefixo de CEP do endereço"""
+    cep_prefix = extract_cep_prefix(address)
+    if not cep_prefix:
+        return None
+    return get_zone_table().get(cep_prefix)
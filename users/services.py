@@ -0,0 +1,74 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import User
+from collections import namedtuple
+import hashlib
+import secrets
+
+# O que o checkout precisa do cliente: id para o pedido e nome/e-mail para o documento de busca
+CustomerRef = namedtuple('CustomerRef', ['id', 'first_name', 'last_name', 'email'])
+
+
+def _customer_cache_key(email):
+    """Chave de cache do cliente (hash do e-mail para não expor o endereço na chave)"""
+    return f'customer:{hashlib.sha256(email.encode()).hexdigest()}'
+
+
+def split_name(full_name):
+    """Separa o nome completo em (primeiro nome, sobrenome) numa única passada"""
+    parts = (full_name or '').split()
+    return (parts[0] if parts else ''), ' '.join(parts[1:])
+
+
+def _fallback_username(email):
+    """Username alternativo para quando o e-mail já é o username de outra conta"""
+    suffix = secrets.token_hex(4)
+    return f'{email[:150 - len(suffix) - 1]}-{suffix}'
+
+
+def invalidate_customer(email):
+    """Remove o cliente do cache (chamado quando o usuário é apagado ou muda de nome)"""
+    if email:
+        cache.delete(_customer_cache_key(email))
+
+
+def resolve_customer(email, full_name='', phone='', address=''):
+    """Retorna o CustomerRef do cliente com esse e-mail, criando o usuário no primeiro pedido.
+
+    Clientes que voltam saem do cache sem tocar na tabela de usuários. Na primeira
+    compra o INSERT usa ON CONFLICT DO NOTHING, então dois pedidos simultâneos do mesmo
+    e-mail não geram IntegrityError: quem perder a corrida apenas lê o id já gravado.
+    Como no get_or_create anterior, os dados de um cliente existente não são alterados.
+    O ON CONFLICT também cobre o username: se o e-mail já é o username de outra conta
+    (com outro e-mail), o insert não grava nada e o cliente é criado com um username
+    alternativo.
+    """
+    cache_key = _customer_cache_key(email)
+    customer = cache.get(cache_key)
+    if customer is not None:
+        return customer
+
+    fields = ('id', 'first_name', 'last_name', 'email')
+    row = User.objects.filter(email=email).values_list(*fields).first()
+    if row is None:
+        first_name, last_name = split_name(full_name)
+        for username in (email, _fallback_username(email)):
+            User.objects.bulk_create([
+                User(
+                    email=email,
+                    username=username,
+                    first_name=first_name,
+                    last_name=last_name,
+                    phone_number=phone,
+                    address=address,
+                )
+            ], ignore_conflicts=True)
+            row = User.objects.filter(email=email).values_list(*fields).first()
+            if row is not None:
+                break
+        else:
+            row = User.objects.filter(email=email).values_list(*fields).get()
+
+    customer = CustomerRef(*row)
+    cache.set(cache_key, customer, getattr(settings, 'CUSTOMER_CACHE_TIMEOUT', 300))
+    return customer
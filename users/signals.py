@@ -0,0 +1,18 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import User
+from .services import invalidate_customer
+
+
+@receiver(post_delete, sender=User)
+def invalidate_customer_cache(sender, instance, **kwargs):
+    """Tira o e-mail do cache de clientes quando o usuário é apagado"""
+    invalidate_customer(instance.email)
+
+
+@receiver(post_save, sender=User)
+def refresh_customer_cache(sender, instance, created, update_fields=None, **kwargs):
+    """Tira o cliente do cache quando nome ou e-mail muda (o cache alimenta a busca de pedidos)"""
+    if created or (update_fields is not None and not {'first_name', 'last_name', 'email'}.intersection(update_fields)):
+        return
+    invalidate_customer(instance.email)